@@ -1,12 +1,47 @@
 from flask import Flask
 from app.routes.characters import characters_bp
 from app.routes.location import location_bp
+from app.routes.metrics import metrics_bp
+from app.routes.health import health_bp
 from app.error_handlers import register_error_handlers
+from app.commands import register_commands
+from app.json_provider import FastJSONProvider
+from app.metrics import register_metrics
+from app.extensions import (
+    init_rick_and_morty_api,
+    init_characters_cache,
+    init_character_store_cache,
+    init_location_cache,
+    init_location_index,
+    init_response_body_cache,
+    init_warm_up,
+    uses_location_index,
+    uses_sqlite_mirror,
+)
 
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    init_rick_and_morty_api(app)
+    init_characters_cache(app)
+    init_character_store_cache(app)
+    init_response_body_cache(app)
+    if uses_location_index():
+        init_location_index(app)
+    elif not uses_sqlite_mirror():
+        init_location_cache(app)
     app.register_blueprint(characters_bp)
     app.register_blueprint(location_bp)
+
+    # Con WARMUP=1 los datos se precalientan en segundo plano y /readyz
+    # responde 503 hasta que termina
+    init_warm_up(app)
+
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp)
+    register_metrics(app)
     register_error_handlers(app)
+    register_commands(app)
     return app
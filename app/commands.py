@@ -0,0 +1,11 @@
+import click
+from app.extensions import get_sqlite_mirror
+
+
+def register_commands(app):
+    @app.cli.command("sync-mirror")
+    def sync_mirror():
+        """Sync the local SQLite mirror with the external API."""
+        mirror = get_sqlite_mirror()
+        mirror.sync()
+        click.echo(f"SQLite mirror synced: {mirror.path}")
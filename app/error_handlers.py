@@ -1,16 +1,34 @@
 from flask import jsonify
 from app.exceptions.external_api import ExternalAPIError
+from app.exceptions.invalid_request import InvalidRequestError
+
+
+# Cuerpo de la respuesta de error de un ExternalAPIError. Tambien se usa
+# para los errores de cada consulta de /locations/batch
+def external_api_error_body(e):
+    return {
+        "error": str(e),
+        "source": "external_api",
+        "status_code": e.status_code or 500
+    }
 
 
 def register_error_handlers(app):
     @app.errorhandler(ExternalAPIError)
     def handle_external_api_error(e):
+        response = external_api_error_body(e)
+        return jsonify(response), e.status_code or 500, {
+            "Content-Type": "application/json"
+            }
+
+    @app.errorhandler(InvalidRequestError)
+    def handle_invalid_request_error(e):
         response = {
             "error": str(e),
-            "source": "external_api",
-            "status_code": e.status_code or 500
+            "source": "request",
+            "status_code": e.status_code
         }
-        return jsonify(response), e.status_code or 500, {
+        return jsonify(response), e.status_code, {
             "Content-Type": "application/json"
             }
 
@@ -4,3 +4,9 @@ class ExternalAPIError(Exception):
         self.message = message
         self.status_code = status_code or 502
         self.payload = payload or {}
+
+
+# La API externa no devolvio todos los personajes pedidos por id (por
+# ejemplo porque hay ids salteados)
+class MissingCharactersError(ExternalAPIError):
+    pass
@@ -0,0 +1,5 @@
+class InvalidRequestError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code or 400
@@ -0,0 +1,232 @@
+import atexit
+import os
+import threading
+from flask import current_app
+from app.services.cache import StaleWhileRevalidateCache
+from app.services.character_sync import CharacterStatsSync
+from app.services.location_cache import LocationLookupCache
+from app.services.location_index import LocationIndex
+from app.services.response_body_cache import ResponseBodyCache
+from app.services.rick_and_morty_api import RickAndMortyAPI, create_session
+from app.services.shared_snapshot import SharedSnapshotCache
+from app.services.sqlite_mirror import SQLiteMirror
+from app.services.warm_up import WarmUp
+
+# Claves bajo las que se guardan los objetos compartidos en app.extensions
+RICK_AND_MORTY_API = "rick_and_morty_api"
+CHARACTERS_SOURCE = "characters_source"
+CHARACTERS_CACHE = "characters_cache"
+CHARACTER_STORE_CACHE = "character_store_cache"
+SQLITE_MIRROR = "sqlite_mirror"
+LOCATION_INDEX = "location_index"
+LOCATION_CACHE = "location_cache"
+RESPONSE_BODY_CACHE = "response_body_cache"
+WARM_UP = "warm_up"
+
+_init_lock = threading.RLock()
+
+
+# Crea el cliente de la API externa que comparten todos los requests de la app
+def init_rick_and_morty_api(app):
+    external_api = RickAndMortyAPI(session=create_session())
+    app.extensions[RICK_AND_MORTY_API] = external_api
+
+    # Cierro las conexiones del pool cuando termina el proceso
+    atexit.register(external_api.close)
+    return external_api
+
+
+# Indica si las rutas se responden con la copia local en SQLite
+def uses_sqlite_mirror():
+    return os.getenv("STORAGE_BACKEND", "api") == "sqlite"
+
+
+# Crea la copia local en SQLite de los datos de la API externa
+def init_sqlite_mirror(app):
+    mirror = SQLiteMirror(
+        os.getenv("SQLITE_MIRROR_PATH", "rick_and_morty.sqlite3"),
+        _app_extension(app, RICK_AND_MORTY_API, init_rick_and_morty_api)
+        )
+    app.extensions[SQLITE_MIRROR] = mirror
+    return mirror
+
+
+# Indica si /location se responde con el indice de locaciones en memoria
+def uses_location_index():
+    return os.getenv("LOCATION_INDEX", "0") == "1"
+
+
+# Directorio de los snapshots compartidos entre los workers, o None si cada
+# worker tiene sus propios caches
+def shared_cache_dir():
+    return os.getenv("SHARED_CACHE_DIR") or None
+
+
+# Path del snapshot compartido con el nombre indicado, o None si no se usan
+def _shared_snapshot_path(name):
+    directory = shared_cache_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, f"{name}.pickle")
+
+
+# Cache de un valor de la app: un snapshot en archivo compartido entre los
+# workers si SHARED_CACHE_DIR esta definido, o un cache en memoria
+def _new_cache(name, loader):
+    ttl = float(os.getenv("CHARACTERS_CACHE_TTL", 300))
+    path = _shared_snapshot_path(name)
+    if path is not None:
+        return SharedSnapshotCache(path, loader, ttl)
+    return StaleWhileRevalidateCache(loader, ttl)
+
+
+# Crea el indice de locaciones en memoria y empieza a cargarlo en segundo
+# plano. Hasta que termina la carga las consultas van a la API externa
+def init_location_index(app):
+    location_index = LocationIndex(
+        _app_extension(app, RICK_AND_MORTY_API, init_rick_and_morty_api),
+        shared_path=_shared_snapshot_path("locations")
+        )
+    app.extensions[LOCATION_INDEX] = location_index
+    location_index.start()
+    return location_index
+
+
+# Crea el cache LRU de las busquedas de /location delante del cliente de la
+# API externa
+def init_location_cache(app):
+    cache = LocationLookupCache(
+        _app_extension(app, RICK_AND_MORTY_API, init_rick_and_morty_api)
+        )
+    app.extensions[LOCATION_CACHE] = cache
+    return cache
+
+
+# Crea la fuente de los personajes: la copia local en SQLite o la
+# sincronizacion incremental con la API externa, que en cada refresh solo
+# descarga las paginas de personajes que pueden haber cambiado
+def init_characters_source(app):
+    if uses_sqlite_mirror():
+        source = _app_extension(app, SQLITE_MIRROR, init_sqlite_mirror)
+    else:
+        source = CharacterStatsSync(
+            _app_extension(app, RICK_AND_MORTY_API, init_rick_and_morty_api)
+            )
+    app.extensions[CHARACTERS_SOURCE] = source
+    return source
+
+
+# Crea el cache del agregado de /characters
+def init_characters_cache(app):
+    source = _app_extension(app, CHARACTERS_SOURCE, init_characters_source)
+    cache = _new_cache("characters", lambda: source.get_all_characters_stats())
+    app.extensions[CHARACTERS_CACHE] = cache
+    return cache
+
+
+# Crea el cache del CharacterStore que usa /characters/stats. Comparte la
+# fuente (y su sincronizacion incremental) con el cache de /characters
+def init_character_store_cache(app):
+    source = _app_extension(app, CHARACTERS_SOURCE, init_characters_source)
+    cache = _new_cache("character_store", lambda: source.get_character_store())
+    app.extensions[CHARACTER_STORE_CACHE] = cache
+    return cache
+
+
+# Crea el cache de los cuerpos de respuesta serializados y comprimidos
+def init_response_body_cache(app):
+    cache = ResponseBodyCache()
+    app.extensions[RESPONSE_BODY_CACHE] = cache
+    return cache
+
+
+# Indica si la app se precalienta al arrancar
+def uses_warm_up():
+    return os.getenv("WARMUP", "0") == "1"
+
+
+# Crea el warm-up de los objetos ya inicializados en la app: los caches de
+# /characters y /characters/stats y, si se usan, la copia en SQLite y el
+# indice de locaciones. Con WARMUP=1 empieza en segundo plano; si no, la
+# app se considera lista desde el principio
+def init_warm_up(app):
+    steps = [
+        app.extensions[key].get
+        for key in (CHARACTERS_CACHE, CHARACTER_STORE_CACHE)
+        if key in app.extensions
+    ]
+    if SQLITE_MIRROR in app.extensions:
+        steps.append(app.extensions[SQLITE_MIRROR].ensure_fresh)
+    if LOCATION_INDEX in app.extensions:
+        location_index = app.extensions[LOCATION_INDEX]
+        steps.append(
+            lambda: location_index.is_ready() or location_index.load()
+            )
+
+    warm_up = WarmUp(steps)
+    app.extensions[WARM_UP] = warm_up
+    if uses_warm_up():
+        warm_up.start()
+    else:
+        warm_up.skip()
+    return warm_up
+
+
+# Devuelve el objeto guardado bajo "key" en la app, creandolo si hace falta
+def _app_extension(app, key, init):
+    extension = app.extensions.get(key)
+    if extension is None:
+        with _init_lock:
+            extension = app.extensions.get(key)
+            if extension is None:
+                extension = init(app)
+    return extension
+
+
+# Devuelve el objeto guardado bajo "key" en la app actual. Si la app no lo
+# inicializo (por ejemplo una app de tests con un solo blueprint) lo crea
+def _get_or_init(key, init):
+    return _app_extension(current_app, key, init)
+
+
+def get_rick_and_morty_api():
+    return _get_or_init(RICK_AND_MORTY_API, init_rick_and_morty_api)
+
+
+def get_characters_cache():
+    return _get_or_init(CHARACTERS_CACHE, init_characters_cache)
+
+
+def get_character_store_cache():
+    return _get_or_init(CHARACTER_STORE_CACHE, init_character_store_cache)
+
+
+def get_response_body_cache():
+    return _get_or_init(RESPONSE_BODY_CACHE, init_response_body_cache)
+
+
+def get_warm_up():
+    return _get_or_init(WARM_UP, init_warm_up)
+
+
+def get_sqlite_mirror():
+    return _get_or_init(SQLITE_MIRROR, init_sqlite_mirror)
+
+
+def get_location_index():
+    return _get_or_init(LOCATION_INDEX, init_location_index)
+
+
+def get_location_cache():
+    return _get_or_init(LOCATION_CACHE, init_location_cache)
+
+
+# Devuelve el objeto que responde las consultas de /location: la copia local
+# en SQLite, el indice en memoria o el cliente de la API externa detras del
+# cache de busquedas
+def get_location_source():
+    if uses_sqlite_mirror():
+        return get_sqlite_mirror()
+    if uses_location_index():
+        return get_location_index()
+    return get_location_cache()
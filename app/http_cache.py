@@ -0,0 +1,67 @@
+import os
+from flask import current_app, request
+from app.extensions import get_response_body_cache
+from app.services.response_body_cache import EncodedBody, supported_encodings
+
+
+# Arma la respuesta JSON con un ETag fuerte calculado a partir del contenido
+# y el header Cache-Control. Si el cliente manda un If-None-Match que
+# coincide con el ETag se responde 304 sin cuerpo
+def cacheable_json_response(result, headers=None):
+    return _send(EncodedBody(_json_bytes(result)), headers)
+
+
+# Igual que cacheable_json_response, pero el cuerpo serializado (y sus
+# versiones comprimidas) se guarda por ruta y por los valores de los query
+# params de "params" (los que lee la ruta; los demas, como los cache-buster,
+# no crean otra entrada), y se reutiliza mientras "version" (el objeto
+# cacheado del que sale el resultado) sea el mismo. build() arma el
+# resultado, y solo se llama si hace falta serializarlo. "vary" son los
+# headers del request, ademas de Accept-Encoding, de los que depende la
+# respuesta
+def versioned_json_response(version, build, headers=None, vary=(),
+                            params=()):
+    body = get_response_body_cache().get(
+        request.endpoint,
+        tuple(request.args.get(name) for name in params),
+        version,
+        lambda: _json_bytes(build())
+        )
+    return _send(body, headers, vary)
+
+
+# Bytes del JSON, los mismos que genera jsonify
+def _json_bytes(result):
+    return current_app.json.response(result).get_data()
+
+
+# Codificacion del cuerpo segun Accept-Encoding. Los cuerpos chicos no se
+# comprimen
+def _negotiate_encoding(body):
+    if len(body.data) < int(os.getenv("COMPRESSION_MIN_SIZE", 1024)):
+        return "identity"
+    return request.accept_encodings.best_match(
+        supported_encodings()
+        ) or "identity"
+
+
+def _send(body, headers, vary=()):
+    encoding = _negotiate_encoding(body)
+
+    response = current_app.response_class(
+        body.encode(encoding),
+        mimetype=current_app.json.mimetype
+        )
+    response.headers.update(headers or {})
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.vary.update(vary)
+
+    response.set_etag(body.etag_for(encoding))
+    response.cache_control.public = True
+    response.cache_control.max_age = int(
+        os.getenv("CACHE_CONTROL_MAX_AGE", 60)
+        )
+
+    return response.make_conditional(request)
@@ -0,0 +1,75 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+
+# orjson es opcional: si esta instalado se usa para codificar y decodificar
+# JSON, si no se usa la libreria estandar
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# Decodifica JSON (str o bytes)
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Codifica a bytes de JSON compacto con las claves ordenadas. Para los datos
+# de este servicio (strings, enteros, listas y dicts) el resultado es
+# identico byte a byte al de la libreria estandar (y al de jsonify): si
+# orjson genera caracteres no ASCII, que la libreria estandar escapa, o no
+# puede codificar algun objeto, se codifica con la libreria estandar.
+# "default" se usa para los tipos que JSON no soporta
+def dumps(obj, default=None):
+    if orjson is not None:
+        try:
+            data = orjson.dumps(
+                obj,
+                default=default,
+                option=(
+                    orjson.OPT_SORT_KEYS
+                    | orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_PASSTHROUGH_DATACLASS
+                    )
+                )
+        except TypeError:
+            data = None
+        if data is not None and data.isascii():
+            return data
+
+    return json.dumps(
+        obj,
+        default=default,
+        sort_keys=True,
+        separators=(",", ":")
+        ).encode()
+
+
+# JSONProvider de Flask que usa orjson cuando esta disponible. Las
+# respuestas compactas tienen los mismos bytes que con DefaultJSONProvider.
+# dumps sigue usando la libreria estandar, ya que su formato por defecto
+# (con espacios) no se puede generar con orjson
+class FastJSONProvider(DefaultJSONProvider):
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        # En modo debug o no compacto uso la respuesta con indentacion
+        if (
+            orjson is None
+            or not self.sort_keys
+            or not self.ensure_ascii
+            or self.compact is False
+            or (self.compact is None and self._app.debug)
+        ):
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps(obj, default=self.default) + b"\n",
+            mimetype=self.mimetype
+            )
@@ -0,0 +1,113 @@
+import os
+import time
+from urllib.parse import urlsplit
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# En modo multiproceso cada metrica abre su archivo en
+# PROMETHEUS_MULTIPROC_DIR apenas se crea. gunicorn crea el directorio al
+# arrancar, pero los comandos que no pasan por gunicorn (flask sync-mirror,
+# run.py) importan este modulo sin que exista
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.getenv("PROMETHEUS_MULTIPROC_DIR"), exist_ok=True)
+
+# Metricas de las rutas
+ROUTE_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of the requests to this service",
+    ["route", "method", "status_code"]
+    )
+ROUTE_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests to this service currently being handled",
+    multiprocess_mode="livesum"
+    )
+
+# Metricas de los requests a la API externa
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of the requests to the external API",
+    ["endpoint"]
+    )
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed requests to the external API by the status code they map to",
+    ["status_code"]
+    )
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_requests_in_flight",
+    "Requests to the external API currently in progress",
+    multiprocess_mode="livesum"
+    )
+CHARACTER_PAGES = Histogram(
+    "character_pages_fetched",
+    "Character pages requested to build the /characters aggregate",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+    )
+
+# Metricas del cache de busquedas de /location
+LOCATION_CACHE_REQUESTS = Counter(
+    "location_cache_requests_total",
+    "Location lookups by cache result (hits, negative_hits or misses)",
+    ["result"]
+    )
+LOCATION_CACHE_EVICTIONS = Counter(
+    "location_cache_evictions_total",
+    "Location lookups evicted from the full cache"
+    )
+
+
+# Nombre del endpoint de la API externa de un URL ("/character",
+# "/location"), sin ids ni query params para no crear una serie por URL
+def upstream_endpoint(base_url, url):
+    path = urlsplit(url).path
+    base_path = urlsplit(base_url).path
+    if path.startswith(base_path):
+        path = path[len(base_path):]
+
+    resource = path.strip("/").split("/")[0]
+    return f"/{resource}" if resource else "/"
+
+
+# Registra los hooks que miden la latencia de cada ruta
+def register_metrics(app):
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        ROUTE_IN_FLIGHT.inc()
+
+    @app.after_request
+    def observe_request_latency(response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            ROUTE_LATENCY.labels(
+                route=request.url_rule.rule if request.url_rule else "unknown",
+                method=request.method,
+                status_code=response.status_code
+                ).observe(time.perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        ROUTE_IN_FLIGHT.dec()
+
+
+# Texto con todas las metricas. Con gunicorn (PROMETHEUS_MULTIPROC_DIR
+# definido) junta las metricas de todos los workers
+def render_metrics():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,8 +1,37 @@
-from flask import Blueprint, jsonify
-from app.services.rick_and_morty_api import RickAndMortyAPI
+import base64
+import binascii
+import csv
+import io
+import os
+from itertools import chain
+from flask import Blueprint, Response, request
+from app.error_handlers import external_api_error_body
+from app.exceptions.external_api import ExternalAPIError
+from app.exceptions.invalid_request import InvalidRequestError
+from app.extensions import (
+    get_character_store_cache,
+    get_characters_cache,
+    get_rick_and_morty_api,
+    get_sqlite_mirror,
+    uses_sqlite_mirror,
+)
+from app.http_cache import versioned_json_response
+from app.json_provider import dumps
+from app.services.character_store import GROUP_BY_COLUMNS
+from app.services.page_parser import CHARACTER_COLUMNS, character_row
 
 characters_bp = Blueprint("characters", __name__)
 
+NDJSON = "application/x-ndjson"
+COUNTERS = ("human_count", "not_human_count", "dead_count", "alive_count")
+
+# Columnas de /characters/export, las mismas con o sin la copia en SQLite
+EXPORT_FIELDS = CHARACTER_COLUMNS
+# Formatos de /characters/export y su mimetype
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": NDJSON}
+# Filas leidas de la copia en SQLite por cada chunk del export
+EXPORT_CHUNK_ROWS = 500
+
 
 @characters_bp.route("/characters", methods=["GET"])
 def characters():
@@ -11,6 +40,15 @@ def characters():
 
     returns a list of character names and some statistics
 
+    The result is cached (see CHARACTERS_CACHE_TTL). The X-Cache-Age header
+    holds how many seconds ago the served result was computed (the standard
+    Age header is left to HTTP caches, which count it against max-age).
+
+    The response has an ETag, so a request with a matching If-None-Match
+    header gets an empty 304 response. The serialized body is cached
+    (gzip or brotli compressed too, chosen with Accept-Encoding) until the
+    cached result changes.
+
     Returns a JSON containing:
 
         - character_names: list of all names
@@ -18,8 +56,294 @@ def characters():
         - not_human_count: number of non-humans
         - dead_count: number of dead characters
         - alive_count: number of alive characters
+
+    Query Parameters (optional, to get the names in slices):
+
+        - limit: int, max amount of names to return
+          (at most CHARACTERS_MAX_LIMIT, which is also the default)
+        - cursor: str, the next_cursor of the previous slice
+
+    When any of them is sent the JSON also contains:
+
+        - next_cursor: cursor of the next slice, null on the last one
+
+    With "Accept: application/x-ndjson" the response is streamed as one
+    JSON object per line instead: one {"character_names": [...]} line per
+    page of characters, followed by a line with the four counters.
+    """
+    mimetype = request.accept_mimetypes.best_match(
+        ["application/json", NDJSON]
+        )
+    if mimetype == NDJSON:
+        return _stream_characters()
+
+    character_stats, age = get_characters_cache().get()
+
+    def build():
+        if "limit" in request.args or "cursor" in request.args:
+            return _paginate(
+                character_stats,
+                request.args.get("limit"),
+                request.args.get("cursor")
+                )
+        return character_stats
+
+    # Con otro Accept la respuesta es el stream NDJSON, asi que un cache
+    # intermedio no puede reutilizar esta para cualquier Accept
+    return versioned_json_response(
+        character_stats,
+        build,
+        {"X-Cache-Age": str(int(age))},
+        vary=("Accept",),
+        params=("limit", "cursor")
+        )
+
+
+@characters_bp.route("/characters/stats", methods=["GET"])
+def characters_stats():
+    """
+    GET /characters/stats endpoint
+
+    returns how many characters there are for each combination of values
+    of the requested fields
+
+    Uses the same cached character data as /characters and has an ETag
+    and an X-Cache-Age header like it.
+
+    Query Parameters:
+
+        - group_by: str, comma separated fields to group the characters
+          by: species, status, gender and/or origin
+
+    Returns a JSON containing:
+
+        - group_by: list of the fields
+        - total: number of characters
+        - groups: list of {<field>: value, ..., "count": int}, from the
+          biggest group to the smallest
+    """
+    group_by = _parse_group_by(request.args.get("group_by"))
+    store, age = get_character_store_cache().get()
+
+    return versioned_json_response(
+        store,
+        lambda: {
+            "group_by": group_by,
+            "total": len(store),
+            "groups": store.count_by(group_by),
+        },
+        {"X-Cache-Age": str(int(age))},
+        params=("group_by",)
+        )
+
+
+@characters_bp.route("/characters/export", methods=["GET"])
+def characters_export():
     """
-    external_api = RickAndMortyAPI()
-    result = external_api.get_all_characters_stats()
+    GET /characters/export?format=csv endpoint
+
+    returns every character, one row per character, in the order of the
+    external API
+
+    Query Parameters:
+
+        - format: str, "csv" (the default, with a header row) or "ndjson"
+          (one JSON object per line)
+
+    Each row has the id, name, species, status, gender and the names of
+    the origin and location of the character. Values that are missing or
+    not strings are empty in the CSV and null in the NDJSON.
+
+    The rows are streamed (chunked transfer) while the pages are fetched
+    from the external API, or read from the SQLite mirror when
+    STORAGE_BACKEND=sqlite, so the memory used does not grow with the
+    dataset. If the external API fails after the response has started, the
+    NDJSON export ends with the error object and the CSV export is cut
+    short without the final chunk.
+    """
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        raise InvalidRequestError(
+            f"Invalid format: {export_format!r}, expected csv or ndjson"
+            )
+
+    row_chunks = _export_row_chunks()
+    if export_format == "csv":
+        chunks = _csv_chunks(row_chunks)
+        headers = {
+            "Content-Disposition": "attachment; filename=characters.csv"
+            }
+    else:
+        chunks = _ndjson_export_chunks(row_chunks)
+        headers = {}
+
+    return Response(
+        chunks,
+        mimetype=EXPORT_FORMATS[export_format],
+        headers=headers
+        )
+
+
+# Filas del export (tuplas con los valores de EXPORT_FIELDS) en listas: una
+# por pagina de la API externa o de a EXPORT_CHUNK_ROWS de la copia en SQLite
+def _export_row_chunks():
+    if uses_sqlite_mirror():
+        return get_sqlite_mirror().iter_character_rows(EXPORT_CHUNK_ROWS)
+
+    pages = _prefetch_first(
+        get_rick_and_morty_api().iter_all_pages("character")
+        )
+    return (
+        [character_row(character) for character in page.get("results", [])]
+        for page in pages
+    )
+
+
+# Un chunk de la respuesta por cada lista de filas. La cabecera va en el
+# primero
+def _csv_chunks(row_chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in row_chunks:
+        writer.writerows(chunk)
+        # No envio chunks vacios (una pagina sin personajes), que en la
+        # codificacion chunked marcarian el final de la respuesta
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    # Sin personajes todavia falta enviar la cabecera
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson_export_chunks(row_chunks):
+    try:
+        for chunk in row_chunks:
+            if chunk:
+                yield b"".join(
+                    dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n"
+                    for row in chunk
+                )
+
+    # La respuesta ya empezo, asi que el error se envia como ultima linea
+    except ExternalAPIError as e:
+        yield dumps(external_api_error_body(e)) + b"\n"
+
+
+# Lista de columnas de group_by ("species,status")
+def _parse_group_by(group_by):
+    if not group_by:
+        raise InvalidRequestError("group_by is required")
+
+    columns = [column.strip() for column in group_by.split(",")]
+    for column in columns:
+        if column not in GROUP_BY_COLUMNS:
+            raise InvalidRequestError(
+                f"Invalid group_by field: {column!r}, expected any of "
+                f"{', '.join(GROUP_BY_COLUMNS)}"
+                )
+    if len(set(columns)) != len(columns):
+        raise InvalidRequestError("group_by fields must not be repeated")
+
+    return columns
+
+
+# Devuelve los contadores y una porcion de los nombres del agregado
+def _paginate(character_stats, limit, cursor):
+    max_limit = int(os.getenv("CHARACTERS_MAX_LIMIT", 1000))
+
+    if limit is None:
+        limit = max_limit
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise InvalidRequestError("limit must be an integer")
+        if limit < 1:
+            raise InvalidRequestError("limit must be greater than 0")
+        limit = min(limit, max_limit)
+
+    offset = _decode_cursor(cursor) if cursor else 0
+    names = character_stats["character_names"]
+    next_offset = offset + limit
+
+    result = {counter: character_stats[counter] for counter in COUNTERS}
+    result["character_names"] = names[offset:next_offset]
+    result["next_cursor"] = (
+        _encode_cursor(next_offset) if next_offset < len(names) else None
+        )
+    return result
+
+
+# El cursor es la posicion del primer nombre de la porcion, codificada para
+# que los clientes no dependan de su formato
+def _encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidRequestError("Invalid cursor")
+
+    if offset < 0:
+        raise InvalidRequestError("Invalid cursor")
+    return offset
+
+
+# Respuesta NDJSON que se envia a medida que llegan las paginas
+def _stream_characters():
+    # Si el agregado ya esta cacheado lo envio directamente, si no
+    # voy enviando las paginas a medida que se piden a la API externa
+    cache = get_characters_cache()
+    character_stats = cache.peek()
+    if character_stats is None and uses_sqlite_mirror():
+        character_stats, _ = cache.get()
+
+    if character_stats is not None:
+        pages = iter([character_stats])
+    else:
+        pages = get_rick_and_morty_api().iter_characters_stats()
+
+    pages = _prefetch_first(pages)
+
+    # El stream no tiene validador, asi que no se guarda en ningun cache; y
+    # como depende de Accept un cache tampoco debe servirlo en lugar del JSON
+    response = Response(_ndjson_lines(pages), mimetype=NDJSON)
+    response.vary.add("Accept")
+    response.cache_control.no_store = True
+    return response
+
+
+# Pido la primera pagina antes de empezar a responder, asi un error de la
+# API externa todavia se puede responder con su status code
+def _prefetch_first(pages):
+    first_page = next(pages, None)
+    if first_page is None:
+        return pages
+    return chain([first_page], pages)
+
+
+def _ndjson_lines(pages):
+    totals = dict.fromkeys(COUNTERS, 0)
+
+    try:
+        for page_stats in pages:
+            for counter in COUNTERS:
+                totals[counter] += page_stats.get(counter, 0)
+
+            yield dumps({
+                "character_names": page_stats.get("character_names", [])
+                }) + b"\n"
+
+    # La respuesta ya empezo, asi que el error se envia como ultima linea
+    except ExternalAPIError as e:
+        yield dumps(external_api_error_body(e)) + b"\n"
+        return
 
-    return jsonify(result), 200, {"Content-Type": "application/json"}
+    yield dumps(totals) + b"\n"
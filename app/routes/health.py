@@ -0,0 +1,37 @@
+from flask import Blueprint, jsonify
+from app.extensions import get_warm_up
+
+health_bp = Blueprint("health", __name__)
+
+# Las respuestas de los health checks no se tienen que cachear
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+@health_bp.route("/healthz", methods=["GET"])
+def healthz():
+    """
+    GET /healthz endpoint (liveness)
+
+    Returns 200 while the process is able to answer requests.
+    """
+    return jsonify({"status": "ok"}), 200, NO_STORE
+
+
+@health_bp.route("/readyz", methods=["GET"])
+def readyz():
+    """
+    GET /readyz endpoint (readiness)
+
+    Returns 200 once the warm-up is done (see WARMUP), so a load balancer
+    only sends traffic to warm workers. Under gunicorn that means the
+    warm-up of every worker, not only the one answering. Until then it
+    returns 503 with the error of the last warm-up attempt, if any.
+    """
+    warm_up = get_warm_up()
+    if warm_up.ready:
+        return jsonify({"status": "ready"}), 200, NO_STORE
+
+    return jsonify({
+        "status": "warming_up",
+        "error": warm_up.error
+        }), 503, NO_STORE
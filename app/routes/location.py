@@ -1,5 +1,11 @@
-from flask import Blueprint, request, jsonify
-from app.services.rick_and_morty_api import RickAndMortyAPI
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, jsonify, request
+from app.error_handlers import external_api_error_body
+from app.exceptions.external_api import ExternalAPIError
+from app.exceptions.invalid_request import InvalidRequestError
+from app.extensions import get_location_source
+from app.http_cache import cacheable_json_response
 
 location_bp = Blueprint("location", __name__)
 
@@ -20,19 +26,115 @@ def location():
 
         - name: The name of the location found
         - type: The type of location found (Planet, Country, etc.)
+
+    The response has an ETag, so a request with a matching If-None-Match
+    header gets an empty 304 response.
     """
     name = request.args.get("name")
     type_ = request.args.get("type")
 
-    external_api = RickAndMortyAPI()
+    external_api = get_location_source()
     location_data = external_api.get_location_by_name_and_type(
         name=name,
         type_=type_
         )
 
-    result = {
+    return cacheable_json_response(_location_result(location_data))
+
+
+@location_bp.route("/locations/batch", methods=["POST"])
+def locations_batch():
+    """
+    POST /locations/batch endpoint
+
+    resolves many /location queries in a single request
+
+    JSON body:
+
+        - queries: list of {"name": str, "type": str} objects (both
+          optional, like the /location query parameters), at most
+          LOCATIONS_BATCH_MAX_SIZE
+
+    Repeated queries are resolved once, and the distinct ones are resolved
+    concurrently (see LOCATIONS_BATCH_MAX_WORKERS).
+
+    Returns a JSON containing:
+
+        - results: one object per query, in the same order, with the
+          "query" and either the "location" found ({"name", "type"}) or
+          the "error" object /location would have answered with
+    """
+    queries = _parse_batch_queries(request.get_json(silent=True))
+
+    # Un filtro vacio es lo mismo que no filtrar
+    query_keys = [(name or None, type_ or None) for name, type_ in queries]
+    keys = list(dict.fromkeys(query_keys))
+    resolved = dict(zip(keys, _resolve_locations(get_location_source(), keys)))
+
+    return jsonify({
+        "results": [
+            {"query": {"name": name, "type": type_}, **resolved[key]}
+            for (name, type_), key in zip(queries, query_keys)
+        ]
+    })
+
+
+def _location_result(location_data):
+    return {
         "name": location_data.get("name"),
         "type": location_data.get("type")
     }
 
-    return jsonify(result), 200, {"Content-Type": "application/json"}
+
+# Lista de (nombre, tipo) de las consultas del body de /locations/batch
+def _parse_batch_queries(body):
+    if not isinstance(body, dict) or not isinstance(
+        body.get("queries"), list
+    ):
+        raise InvalidRequestError(
+            "The body must be a JSON object with a list of queries"
+            )
+
+    max_size = int(os.getenv("LOCATIONS_BATCH_MAX_SIZE", 100))
+    if len(body["queries"]) > max_size:
+        raise InvalidRequestError(f"At most {max_size} queries are allowed")
+
+    queries = []
+    for index, query in enumerate(body["queries"]):
+        if not isinstance(query, dict):
+            raise InvalidRequestError(f"Query {index} must be an object")
+
+        name = query.get("name")
+        type_ = query.get("type")
+        if not isinstance(name, (str, type(None))) or not isinstance(
+            type_, (str, type(None))
+        ):
+            raise InvalidRequestError(
+                f"Query {index}: name and type must be strings"
+                )
+        queries.append((name, type_))
+    return queries
+
+
+# Resuelve las consultas en paralelo. Devuelve, en el mismo orden, un dict
+# con la locacion o con el error de cada una
+def _resolve_locations(source, keys):
+    def resolve(key):
+        name, type_ = key
+        try:
+            location_data = source.get_location_by_name_and_type(
+                name=name,
+                type_=type_
+                )
+        except ExternalAPIError as e:
+            return {"error": external_api_error_body(e)}
+        return {"location": _location_result(location_data)}
+
+    if len(keys) <= 1:
+        return list(map(resolve, keys))
+
+    max_workers = int(os.getenv("LOCATIONS_BATCH_MAX_WORKERS", 8))
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(keys)))
+    ) as executor:
+        return list(executor.map(resolve, keys))
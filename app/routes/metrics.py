@@ -0,0 +1,17 @@
+from flask import Blueprint
+from app.metrics import render_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    GET /metrics endpoint
+
+    Returns the service metrics in the Prometheus text format: latency
+    histograms per route and per external API endpoint, external API
+    errors by status code and in-flight request gauges.
+    """
+    data, content_type = render_metrics()
+    return data, 200, {"Content-Type": content_type}
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Cache de un unico valor con TTL. Una vez que el valor vence se sigue
+# sirviendo el valor viejo mientras un thread en segundo plano lo recalcula,
+# asi ningun request espera a que se recalcule una vez que el cache esta lleno
+class StaleWhileRevalidateCache:
+    def __init__(self, loader, ttl):
+        # Funcion que calcula el valor
+        self.loader = loader
+        # Segundos durante los cuales el valor se considera fresco
+        self.ttl = ttl
+
+        # _lock protege el estado, _load_lock asegura que haya una sola carga
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        self._refreshing = False
+
+    # Devuelve el valor y su antiguedad en segundos
+    def get(self):
+        with self._lock:
+            if self._loaded_at is not None:
+                age = time.monotonic() - self._loaded_at
+
+                # Si el valor vencio lanzo un unico refresh en segundo plano
+                if age >= self.ttl and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, daemon=True).start()
+
+                return self._value, age
+
+        # Si el cache esta vacio el primer request calcula el valor y los
+        # demas esperan a que termine en vez de calcularlo de nuevo
+        with self._load_lock:
+            with self._lock:
+                if self._loaded_at is not None:
+                    return self._value, time.monotonic() - self._loaded_at
+
+            value = self.loader()
+            self._set(value)
+            return value, 0.0
+
+    # Devuelve el valor cacheado (aunque este vencido) sin calcularlo,
+    # o None si el cache esta vacio
+    def peek(self):
+        with self._lock:
+            return self._value
+
+    # Descarta el valor, el proximo get lo vuelve a calcular
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+
+    def _set(self, value):
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+
+    def _refresh(self):
+        try:
+            with self._load_lock:
+                self._set(self.loader())
+
+        # Si falla el refresh se sigue sirviendo el valor viejo y se
+        # reintenta en el proximo get
+        except Exception:
+            logger.exception("Cache refresh failed")
+
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -0,0 +1,182 @@
+from array import array
+from collections import Counter
+
+from app.services.rick_and_morty_api import HUMAN, ALIVE, DEAD
+
+# Columnas por las que se pueden agrupar los personajes
+GROUP_BY_COLUMNS = ("species", "status", "gender", "origin")
+
+
+# Columnas que en la API externa son objetos anidados, de los que guardo
+# el nombre
+NESTED_COLUMNS = ("origin",)
+
+
+# Valores de una columna de los personajes. Solo guardo strings, cualquier
+# otro tipo se guarda como None, asi los conteos dan lo mismo que
+# extract_character_stats
+def _column_values(character_list, column):
+    if column in NESTED_COLUMNS:
+        return [
+            value if isinstance(value, str) else None
+            for value in (
+                nested.get("name") if isinstance(nested, dict) else None
+                for nested in (
+                    character.get(column) for character in character_list
+                )
+            )
+        ]
+    return [
+        value if isinstance(value := character.get(column), str) else None
+        for character in character_list
+    ]
+
+
+# Diccionario de una columna: asigna a cada valor distinto un codigo entero
+# (su posicion en values). Solo crece, asi los codigos de un store ya
+# construido siguen siendo validos
+class Dictionary:
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    # Codigos de una lista de valores. Los valores nuevos se agregan en el
+    # orden en el que aparecen
+    def encode_all(self, values):
+        codes = self._codes
+        for value in dict.fromkeys(values):
+            if value not in codes:
+                codes[value] = len(self.values)
+                self.values.append(value)
+        return array("I", map(codes.__getitem__, values))
+
+    # Codigo de un valor, o None si nunca se guardo
+    def lookup(self, value):
+        return self._codes.get(value)
+
+
+# Un diccionario vacio por columna
+def new_dictionaries():
+    return {column: Dictionary() for column in GROUP_BY_COLUMNS}
+
+
+# Personajes guardados por columnas. species, status, gender y origin se
+# guardan como arrays de codigos de su diccionario, asi los conteos se hacen
+# sobre enteros. Los stores que comparten diccionarios se pueden concatenar
+# sin recodificar
+class CharacterStore:
+    def __init__(self, dictionaries=None):
+        if dictionaries is None:
+            dictionaries = new_dictionaries()
+        self.dictionaries = dictionaries
+        self.columns = {column: array("I") for column in GROUP_BY_COLUMNS}
+        # Nombres validos, igual que character_names de
+        # extract_character_stats
+        self.names = []
+
+    def __len__(self):
+        return len(self.columns[GROUP_BY_COLUMNS[0]])
+
+    @classmethod
+    def from_characters(cls, character_list, dictionaries=None):
+        store = cls(dictionaries)
+        store.extend(character_list)
+        return store
+
+    # Concatena stores que comparten los diccionarios
+    @classmethod
+    def concat(cls, stores, dictionaries):
+        result = cls(dictionaries)
+        for store in stores:
+            if store.dictionaries is not dictionaries:
+                raise ValueError("Stores must share their dictionaries")
+            for column in GROUP_BY_COLUMNS:
+                result.columns[column].extend(store.columns[column])
+            result.names.extend(store.names)
+        return result
+
+    # Agrega los personajes codificando cada columna entera de una vez
+    def extend(self, character_list):
+        character_list = list(character_list)
+
+        self.names.extend(
+            name
+            for name in (character.get("name") for character in character_list)
+            if name and isinstance(name, str)
+            )
+        for column in GROUP_BY_COLUMNS:
+            self.columns[column].extend(
+                self.dictionaries[column].encode_all(
+                    _column_values(character_list, column)
+                    )
+                )
+
+    # Cantidad de personajes con el valor indicado en una columna
+    def count(self, column, value):
+        code = self.dictionaries[column].lookup(value)
+        if code is None:
+            return 0
+        return self.columns[column].count(code)
+
+    # Mismo resultado que extract_character_stats
+    def character_stats(self):
+        human_count = self.count("species", HUMAN)
+        return {
+            "character_names": list(self.names),
+            "human_count": human_count,
+            "not_human_count": len(self) - human_count,
+            "dead_count": self.count("status", DEAD),
+            "alive_count": self.count("status", ALIVE),
+        }
+
+    # Cantidad de personajes por cada combinacion de valores de las columnas.
+    #
+    # Los codigos de las columnas se combinan en una unica clave entera (en
+    # base al tamaño de cada diccionario) y se cuentan las claves, como un
+    # bincount. Devuelve una lista de dicts {columna: valor, ..., "count": n}
+    # ordenada de mayor a menor cantidad
+    def count_by(self, columns):
+        if not columns:
+            raise ValueError("At least one column is required")
+        for column in columns:
+            if column not in self.columns:
+                raise ValueError(f"Unknown column: {column}")
+
+        # Tamaño de los diccionarios en este momento: todos los codigos
+        # de este store son menores
+        radixes = [
+            len(self.dictionaries[column].values) for column in columns
+            ]
+
+        keys = self.columns[columns[0]]
+        for column, radix in zip(columns[1:], radixes[1:]):
+            keys = [
+                key * radix + code
+                for key, code in zip(keys, self.columns[column])
+            ]
+
+        groups = []
+        for key, count in sorted(
+            Counter(keys).items(),
+            key=lambda item: (-item[1], item[0])
+        ):
+            codes = []
+            for radix in reversed(radixes):
+                key, code = divmod(key, radix)
+                codes.append(code)
+
+            group = {
+                column: self.dictionaries[column].values[code]
+                for column, code in zip(columns, reversed(codes))
+            }
+            group["count"] = count
+            groups.append(group)
+        return groups
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+
+from app.exceptions.external_api import MissingCharactersError
+from app.metrics import CHARACTER_PAGES
+from app.services.character_store import CharacterStore, new_dictionaries
+
+logger = logging.getLogger(__name__)
+
+
+# Mantiene los personajes de cada pagina (en un CharacterStore) para no volver
+# a descargar todas las paginas en cada refresh.
+#
+# La API externa agrega los personajes nuevos al final, por lo que si
+# info.count no cambio no hace falta pedir ninguna pagina ademas de la
+# primera, y si crecio solo pueden haber cambiado la ultima pagina conocida
+# y las paginas nuevas.
+#
+# Si la API externa tiene batch_size, en vez de paginas de 20 personajes se
+# piden lotes de batch_size ids (/character/1,2,3) a partir de info.count,
+# con la misma logica incremental. Si faltan ids (la API externa tiene ids
+# salteados) se vuelve a recorrer las paginas.
+#
+# Los cambios dentro de paginas ya descargadas (un status que cambia, o un
+# personaje borrado y otro agregado sin que cambie info.count) no se ven en
+# la sincronizacion incremental, asi que cada full_resync_interval segundos
+# se vuelve a pedir todo
+class CharacterStatsSync:
+    def __init__(self, external_api, full_resync_interval=None):
+        self.external_api = external_api
+        if full_resync_interval is None:
+            full_resync_interval = float(
+                os.getenv("CHARACTERS_FULL_RESYNC_INTERVAL", 3600)
+                )
+        self.full_resync_interval = full_resync_interval
+
+        self._lock = threading.Lock()
+        # info.count de la ultima sincronizacion, y como se dividieron los
+        # personajes: ("pages", tamaño de pagina) o ("batches", batch_size)
+        self._count = None
+        self._layout = None
+        # Momento (time.monotonic) de la ultima sincronizacion completa
+        self._full_synced_at = None
+        # Se deja de pedir por ids si alguna vez faltaron ids
+        self._use_batches = True
+        # Diccionarios que comparten los stores de todas las paginas
+        self._dictionaries = new_dictionaries()
+        # Numero de pagina (o de lote) -> CharacterStore con sus personajes
+        self._page_stores = {}
+
+    # Los contadores de /characters salen del mismo store que /characters/stats
+    def get_all_characters_stats(self):
+        return self.get_character_store().character_stats()
+
+    # Sincroniza y devuelve un CharacterStore con todos los personajes
+    def get_character_store(self):
+        with self._lock:
+            return self._sync()
+
+    # Descarta los personajes guardados, la proxima sincronizacion es completa
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._count = None
+        self._layout = None
+        self._full_synced_at = None
+        self._dictionaries = new_dictionaries()
+        self._page_stores = {}
+
+    def _sync(self):
+        external_api = self.external_api
+        first_page = external_api.get_page("character")
+
+        info = first_page.get("info", {})
+        count = info.get("count")
+        pages = info.get("pages")
+
+        # Sin la informacion de paginacion no puedo saber que paginas
+        # cambiaron, asi que recalculo todo
+        if not isinstance(count, int) or not isinstance(pages, int):
+            self._reset()
+            store = CharacterStore()
+            pages = 0
+            for response in external_api.iter_all_pages("character"):
+                store.extend(response.get("results", []))
+                pages += 1
+            CHARACTER_PAGES.observe(pages)
+            return store
+
+        batch_size = external_api.batch_size
+        if self._use_batches and batch_size > 0:
+            try:
+                return self._sync_parts(
+                    first_page,
+                    count,
+                    ("batches", batch_size),
+                    -(-count // batch_size)
+                    )
+            except MissingCharactersError:
+                logger.warning(
+                    "Character ids are not contiguous, walking the pages"
+                    )
+                self._use_batches = False
+
+        results = first_page.get("results", [])
+        return self._sync_parts(
+            first_page,
+            count,
+            ("pages", len(results)),
+            pages
+            )
+
+    # Sincroniza los personajes divididos en "parts" paginas o lotes
+    def _sync_parts(self, first_page, count, layout, parts):
+        kind = layout[0]
+        now = time.monotonic()
+        full_sync = (
+            self._count is None
+            or count < self._count
+            or layout != self._layout
+            or now - self._full_synced_at >= self.full_resync_interval
+        )
+
+        if full_sync:
+            # Primera sincronizacion, el dataset se achico, cambio el tamaño
+            # de pagina o paso full_resync_interval: pido todo. Empiezo con
+            # diccionarios nuevos para no acumular valores que ya no existen
+            first_stale_part = 1
+            dictionaries = new_dictionaries()
+        elif count == self._count:
+            # Nada cambio: no pido nada mas
+            first_stale_part = parts + 1
+            dictionaries = self._dictionaries
+        else:
+            # Crecio: pido la ultima pagina (o lote) conocida y las nuevas
+            first_stale_part = max(self._page_stores, default=1)
+            dictionaries = self._dictionaries
+
+        # La primera pagina ya la tengo
+        page_stores = {}
+        if kind == "pages":
+            page_stores[1] = CharacterStore.from_characters(
+                first_page.get("results", []),
+                dictionaries
+                )
+            first_stale_part = max(first_stale_part, 2)
+
+        for part in range(1, min(first_stale_part, parts + 1)):
+            if part not in page_stores:
+                page_stores[part] = self._page_stores[part]
+
+        stale_parts = range(first_stale_part, parts + 1)
+        if kind == "pages":
+            character_lists = (
+                response.get("results", [])
+                for response in self.external_api.iter_pages(
+                    "character",
+                    stale_parts
+                    )
+            )
+        else:
+            character_lists = self.external_api.iter_character_batches(
+                count,
+                stale_parts
+                )
+        for part, character_list in zip(stale_parts, character_lists):
+            page_stores[part] = CharacterStore.from_characters(
+                character_list,
+                dictionaries
+                )
+
+        self._count = count
+        self._layout = layout
+        self._dictionaries = dictionaries
+        self._page_stores = page_stores
+        if full_sync:
+            self._full_synced_at = now
+        CHARACTER_PAGES.observe(1 + len(stale_parts))
+
+        # Combino los personajes de todas las partes en orden
+        return CharacterStore.concat(
+            [page_stores[part] for part in sorted(page_stores)],
+            dictionaries
+            )
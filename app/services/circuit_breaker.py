@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from collections import deque
+
+from app.exceptions.external_api import ExternalAPIError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# Circuit breaker para los requests a la API externa.
+#
+# Se abre cuando hay demasiados timeouts seguidos o cuando la proporcion de
+# errores en los ultimos requests supera un limite. Abierto, los requests
+# fallan al instante con un 503 en vez de esperar el timeout. Pasado
+# reset_timeout deja pasar algunos requests de prueba (half open): si
+# funcionan se cierra, si fallan se vuelve a abrir
+class CircuitBreaker:
+    def __init__(
+        self,
+        consecutive_timeouts=None,
+        error_rate=None,
+        window_size=None,
+        reset_timeout=None,
+        half_open_max_calls=None,
+    ):
+        if consecutive_timeouts is None:
+            consecutive_timeouts = int(
+                os.getenv("CIRCUIT_BREAKER_CONSECUTIVE_TIMEOUTS", 3)
+                )
+        if error_rate is None:
+            error_rate = float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", 0.5))
+        if window_size is None:
+            window_size = int(os.getenv("CIRCUIT_BREAKER_WINDOW_SIZE", 20))
+        if reset_timeout is None:
+            reset_timeout = float(
+                os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", 30)
+                )
+        if half_open_max_calls is None:
+            half_open_max_calls = int(
+                os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", 1)
+                )
+
+        self.consecutive_timeouts = consecutive_timeouts
+        self.error_rate = error_rate
+        self.window_size = window_size
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = None
+        self._timeouts = 0
+        self._half_open_calls = 0
+        # Resultado de los ultimos requests (True si fallo)
+        self._window = deque(maxlen=window_size)
+
+    # Se llama antes de cada request. Si el circuito esta abierto lanza
+    # un 503 sin hacer el request
+    def before_call(self):
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise ExternalAPIError(
+                        "External API unavailable (circuit open)",
+                        status_code=503
+                        )
+                self.state = HALF_OPEN
+                self._half_open_calls = 0
+
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise ExternalAPIError(
+                        "External API unavailable (circuit half open)",
+                        status_code=503
+                        )
+                self._half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._close()
+                return
+            self._timeouts = 0
+            self._window.append(False)
+
+    def record_failure(self, timeout=False):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+
+            self._timeouts = self._timeouts + 1 if timeout else 0
+            self._window.append(True)
+
+            too_many_timeouts = self._timeouts >= self.consecutive_timeouts
+            too_many_errors = (
+                len(self._window) == self.window_size
+                and sum(self._window) / self.window_size >= self.error_rate
+                )
+            if too_many_timeouts or too_many_errors:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+    def _close(self):
+        self.state = CLOSED
+        self._timeouts = 0
+        self._window.clear()
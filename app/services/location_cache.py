@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.exceptions.external_api import ExternalAPIError
+from app.metrics import LOCATION_CACHE_EVICTIONS, LOCATION_CACHE_REQUESTS
+
+
+# Normaliza un filtro: la API externa no distingue mayusculas y un filtro
+# vacio no filtra
+def _normalize(value):
+    return value.lower() if isinstance(value, str) else ""
+
+
+# Copia de un error de la API externa, sin el traceback (que mantendria
+# vivos los frames del request que lo levanto)
+def _copy_error(error):
+    return ExternalAPIError(
+        error.message,
+        status_code=error.status_code,
+        payload=error.payload
+        )
+
+
+# Cache LRU de las busquedas de /location delante de otra fuente (el
+# cliente de la API externa).
+#
+# Las busquedas se guardan por (nombre, tipo) normalizados. Las que
+# encuentran una locacion se guardan ttl segundos y las que terminan en un
+# 404 se guardan miss_ttl segundos (menos, para que una locacion nueva
+# aparezca pronto), asi los clientes que repiten busquedas sin resultados
+# no gastan requests a la API externa. Del 404 se guarda el error original
+# y se vuelve a levantar uno igual, asi la respuesta no depende de si la
+# busqueda estaba en el cache. Los demas errores no se guardan
+class LocationLookupCache:
+    def __init__(self, source, max_entries=None, ttl=None, miss_ttl=None):
+        self.source = source
+        if max_entries is None:
+            max_entries = int(os.getenv("LOCATION_CACHE_SIZE", 1024))
+        self.max_entries = max_entries
+        if ttl is None:
+            ttl = float(os.getenv("LOCATION_CACHE_TTL", 300))
+        self.ttl = ttl
+        if miss_ttl is None:
+            miss_ttl = float(os.getenv("LOCATION_CACHE_MISS_TTL", 30))
+        self.miss_ttl = miss_ttl
+
+        self._lock = threading.Lock()
+        # clave -> (vence, locacion o el ExternalAPIError del 404)
+        self._entries = OrderedDict()
+        self._stats = dict.fromkeys(
+            ("hits", "negative_hits", "misses", "evictions"),
+            0
+            )
+
+    def get_location_by_name_and_type(self, name=None, type_=None):
+        key = (_normalize(name), _normalize(type_))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                location = entry[1]
+                miss = isinstance(location, ExternalAPIError)
+                self._record("negative_hits" if miss else "hits")
+                if miss:
+                    raise _copy_error(location)
+                return location
+
+            self._record("misses")
+
+        try:
+            location = self.source.get_location_by_name_and_type(
+                name=name,
+                type_=type_
+                )
+        except ExternalAPIError as e:
+            if e.status_code == 404:
+                self._store(key, _copy_error(e), self.miss_ttl)
+            raise
+
+        self._store(key, location, self.ttl)
+        return location
+
+    # Contadores del cache y cantidad de busquedas guardadas
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, location, ttl):
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, location)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+                LOCATION_CACHE_EVICTIONS.inc()
+
+    # Se llama con _lock tomado
+    def _record(self, result):
+        self._stats[result] += 1
+        LOCATION_CACHE_REQUESTS.labels(result=result).inc()
@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+
+from app.exceptions.external_api import ExternalAPIError
+from app.services.shared_snapshot import SharedSnapshotCache
+
+logger = logging.getLogger(__name__)
+
+
+# Normaliza un texto para compararlo sin distinguir mayusculas
+def _normalize(value):
+    return value.lower() if isinstance(value, str) else ""
+
+
+# Indice en memoria de todas las locaciones de la API externa.
+#
+# Responde get_location_by_name_and_type con la misma semantica que el
+# filtro de la API externa (busqueda parcial sin distinguir mayusculas,
+# primer resultado en el orden de la API). Las busquedas ya resueltas se
+# guardan por (nombre, tipo) normalizados, asi que repetirlas es O(1).
+# Mientras el indice no esta cargado las consultas van a la API externa.
+#
+# Con shared_path las locaciones se leen de un snapshot en archivo que
+# comparten los workers, y solo uno de ellos las descarga en cada refresh
+class LocationIndex:
+    # Cantidad maxima de busquedas resueltas que se guardan
+    MAX_CACHED_QUERIES = 10000
+
+    def __init__(self, external_api, refresh_interval=None, shared_path=None):
+        self.external_api = external_api
+        # Segundos entre cada recarga del indice
+        if refresh_interval is None:
+            refresh_interval = float(
+                os.getenv("LOCATION_INDEX_REFRESH_INTERVAL", 3600)
+                )
+        self.refresh_interval = refresh_interval
+
+        self.snapshot = None
+        if shared_path is not None:
+            self.snapshot = SharedSnapshotCache(
+                shared_path,
+                self.fetch_locations,
+                refresh_interval
+                )
+
+        self._lock = threading.Lock()
+        # Lista de (nombre, tipo, locacion) en el orden de la API
+        self._locations = None
+        # (nombre, tipo) normalizados -> locacion, o None si no hay match
+        self._queries = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_ready(self):
+        return self._locations is not None
+
+    # Descarga todas las locaciones de la API externa
+    def fetch_locations(self):
+        return [
+            location
+            for response in self.external_api.iter_all_pages("location")
+            for location in response.get("results", [])
+        ]
+
+    # Carga todas las locaciones (del snapshot compartido si se usa) y
+    # reemplaza el indice
+    def load(self):
+        if self.snapshot is not None:
+            location_list = self.snapshot.load()
+        else:
+            location_list = self.fetch_locations()
+
+        locations = [
+            (
+                _normalize(location.get("name")),
+                _normalize(location.get("type")),
+                location,
+            )
+            for location in location_list
+        ]
+
+        with self._lock:
+            self._locations = locations
+            self._queries = {}
+
+    # Carga el indice en segundo plano y lo recarga cada refresh_interval
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        # Si el indice ya esta cargado (por el warm-up) espero hasta el
+        # proximo refresh
+        if self.is_ready():
+            self._stop.wait(self.refresh_interval)
+
+        while not self._stop.is_set():
+            try:
+                self.load()
+            except Exception:
+                logger.exception("Location index refresh failed")
+            self._stop.wait(self.refresh_interval)
+
+    def get_location_by_name_and_type(self, name=None, type_=None):
+        with self._lock:
+            locations = self._locations
+            queries = self._queries
+
+        # Indice sin cargar: consulto la API externa
+        if locations is None:
+            return self.external_api.get_location_by_name_and_type(
+                name=name,
+                type_=type_
+                )
+
+        # Igual que la API externa, un filtro vacio no filtra
+        key = (_normalize(name), _normalize(type_))
+        if key in queries:
+            location = queries[key]
+        else:
+            location = next(
+                (
+                    location
+                    for location_name, location_type, location in locations
+                    if key[0] in location_name and key[1] in location_type
+                ),
+                None
+                )
+            if len(queries) < self.MAX_CACHED_QUERIES:
+                queries[key] = location
+
+        if location is None:
+            raise ExternalAPIError(
+                "No matching location found",
+                status_code=404
+                )
+
+        return self.external_api.first_location({"results": [location]})
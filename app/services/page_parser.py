@@ -0,0 +1,124 @@
+from urllib.parse import urlsplit
+
+# ijson es opcional: sin ijson las paginas se decodifican completas
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+# Campos de los personajes que usa el servicio. Del resto (episode, image,
+# url, created, ...) no se guarda nada
+CHARACTER_FIELDS = ("id", "name", "species", "status", "gender")
+# Objetos anidados de los que solo se guarda el nombre
+NESTED_FIELDS = ("origin", "location")
+# Columnas de las filas de personajes, en el orden de character_row. Las
+# usan la copia en SQLite y /characters/export
+CHARACTER_COLUMNS = CHARACTER_FIELDS + NESTED_FIELDS
+
+
+# Copia de un personaje con solo los campos proyectados
+def project_character(character):
+    if not isinstance(character, dict):
+        return character
+
+    projected = {
+        field: character[field]
+        for field in CHARACTER_FIELDS
+        if field in character
+    }
+    for field in NESTED_FIELDS:
+        value = character.get(field)
+        if isinstance(value, dict) and "name" in value:
+            projected[field] = {"name": value["name"]}
+    return projected
+
+
+# Solo se usan strings. Cualquier otro tipo queda como None, asi los
+# conteos dan lo mismo que extract_character_stats
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+# Nombre de un objeto anidado (origin y location de los personajes)
+def _nested_name(value):
+    return _text(value.get("name")) if isinstance(value, dict) else None
+
+
+# Fila (valores de CHARACTER_COLUMNS) de un personaje de la API externa
+def character_row(character):
+    return (
+        character.get("id"),
+        _text(character.get("name")),
+        _text(character.get("species")),
+        _text(character.get("status")),
+        _text(character.get("gender")),
+        _nested_name(character.get("origin")),
+        _nested_name(character.get("location")),
+    )
+
+
+# Decodifica los objetos bajo "prefix" (en la notacion de ijson) a medida
+# que llegan los chunks. ijson arma cada objeto en C y solo se guarda su
+# proyeccion, asi nunca se tiene en memoria mas de un chunk de objetos
+# completos
+def _iter_projected(chunks, prefix, on_chunk=None):
+    items = ijson.sendable_list()
+    coro = ijson.items_coro(items, prefix, use_float=True)
+    for chunk in chunks:
+        coro.send(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk)
+        yield from map(project_character, items)
+        del items[:]
+
+    # Si el JSON esta incompleto ijson levanta un error al cerrar
+    coro.close()
+    yield from map(project_character, items)
+
+
+# Decodifica una pagina de personajes ({"info": ..., "results": [...]})
+def _parse_page(chunks):
+    # info se decodifica en paralelo hasta encontrarlo (la API externa lo
+    # envia primero, asi que casi siempre alcanza con el primer chunk)
+    info = ijson.sendable_list()
+    info_coro = ijson.items_coro(info, "info", use_float=True)
+
+    def find_info(chunk):
+        if not info:
+            info_coro.send(chunk)
+
+    results = list(_iter_projected(chunks, "results.item", find_info))
+
+    page = {"results": results}
+    if info and isinstance(info[0], dict):
+        page["info"] = info[0]
+    return page
+
+
+# Decodifica una lista de personajes (/character/1,2,3)
+def _parse_list(chunks):
+    return list(_iter_projected(chunks, "item"))
+
+
+# Funcion que decodifica los chunks de la respuesta de un URL de personajes
+# guardando solo los campos proyectados, o None si la respuesta de ese URL
+# se tiene que decodificar completa
+def character_parser(base_url, url):
+    base_path = urlsplit(base_url).path.rstrip("/")
+    path = urlsplit(url).path.rstrip("/")
+
+    if path == f"{base_path}/character":
+        parse = _parse_page
+    elif path.startswith(f"{base_path}/character/") and "," in path:
+        parse = _parse_list
+    else:
+        return None
+
+    # Levanta ValueError si el JSON es invalido, igual que json.loads
+    def parse_chunks(chunks):
+        try:
+            return parse(chunks)
+        except ijson.JSONError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+
+    return parse_chunks
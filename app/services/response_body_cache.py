@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# brotli es opcional: sin brotli solo se comprime con gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+# Codificaciones soportadas, en orden de preferencia cuando el cliente
+# acepta varias con la misma prioridad
+def supported_encodings():
+    if brotli is not None:
+        return ["br", "gzip"]
+    return ["gzip"]
+
+
+# Cuerpo de una respuesta ya serializado, con su ETag y sus versiones
+# comprimidas. Cada codificacion se calcula una sola vez, la primera vez
+# que un cliente la pide
+class EncodedBody:
+    def __init__(self, data):
+        self.data = data
+        self.etag = hashlib.sha256(data).hexdigest()
+
+        self._lock = threading.Lock()
+        self._encoded = {}
+
+    # Cuerpo en la codificacion indicada ("identity", "gzip" o "br")
+    def encode(self, encoding):
+        if encoding == "identity":
+            return self.data
+
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                data = self._compress(encoding)
+                self._encoded[encoding] = data
+        return data
+
+    # ETag de la version en la codificacion indicada. Cada codificacion es
+    # una representacion distinta, asi que tiene un ETag fuerte distinto
+    def etag_for(self, encoding):
+        if encoding == "identity":
+            return self.etag
+        return f"{self.etag}-{encoding}"
+
+    def _compress(self, encoding):
+        if encoding == "gzip":
+            return gzip.compress(
+                self.data,
+                compresslevel=int(os.getenv("GZIP_LEVEL", 6)),
+                mtime=0
+                )
+        if encoding == "br" and brotli is not None:
+            return brotli.compress(
+                self.data,
+                quality=int(os.getenv("BROTLI_QUALITY", 5))
+                )
+        raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+# Cache LRU de cuerpos de respuesta, agrupados por namespace (la ruta).
+# Cada namespace guarda el objeto del que se generaron sus cuerpos (por
+# ejemplo el agregado cacheado de /characters) y sus cuerpos solo se
+# reutilizan mientras ese objeto sea el mismo, asi un refresh del agregado
+# invalida los cuerpos sin tener que avisarle a este cache. Cuando llega
+# una version nueva los cuerpos de la anterior se descartan, para no
+# mantener vivo el objeto viejo
+class ResponseBodyCache:
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = int(os.getenv("RESPONSE_BODY_CACHE_SIZE", 128))
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # (namespace, clave) -> EncodedBody
+        self._entries = OrderedDict()
+        # namespace -> version de sus cuerpos
+        self._versions = {}
+
+    # Devuelve el cuerpo guardado bajo "key" en el namespace para esta
+    # version, o lo arma con build() (que devuelve los bytes sin comprimir)
+    # y lo guarda
+    def get(self, namespace, key, version, build):
+        entry_key = (namespace, key)
+        with self._lock:
+            if self._versions.get(namespace) is version:
+                body = self._entries.get(entry_key)
+                if body is not None:
+                    self._entries.move_to_end(entry_key)
+                    return body
+
+        # Serializo fuera del lock. Si dos requests arman el mismo cuerpo
+        # a la vez el resultado es el mismo
+        body = EncodedBody(build())
+
+        with self._lock:
+            if self._versions.get(namespace) is not version:
+                self._discard(namespace)
+                self._versions[namespace] = version
+            self._entries[entry_key] = body
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    # Se llama con _lock tomado
+    def _discard(self, namespace):
+        for entry_key in [key for key in self._entries if key[0] == namespace]:
+            del self._entries[entry_key]
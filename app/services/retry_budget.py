@@ -0,0 +1,56 @@
+import os
+import random
+import threading
+
+
+# Limita la cantidad de reintentos a la API externa. Cada request suma
+# "ratio" al presupuesto y cada reintento gasta 1, asi que en un incidente
+# los reintentos no pueden superar esa proporcion de los requests.
+# El presupuesto empieza lleno para que los errores aislados se reintenten
+class RetryBudget:
+    def __init__(self, ratio=None, max_tokens=None, max_retries=None,
+                 base_delay=None, max_delay=None):
+        if ratio is None:
+            ratio = float(os.getenv("RETRY_BUDGET_RATIO", 0.2))
+        if max_tokens is None:
+            max_tokens = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", 10))
+        if max_retries is None:
+            max_retries = int(os.getenv("RETRY_MAX_ATTEMPTS", 2))
+        if base_delay is None:
+            base_delay = float(os.getenv("RETRY_BASE_DELAY", 0.1))
+        if max_delay is None:
+            max_delay = float(os.getenv("RETRY_MAX_DELAY", 2))
+
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        # Reintentos maximos de un mismo request
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._tokens = max_tokens
+
+    # Se llama una vez por request
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    # Indica si se puede hacer el reintento numero "attempt" (desde 1) y
+    # en ese caso lo descuenta del presupuesto
+    def can_retry(self, attempt):
+        if attempt > self.max_retries:
+            return False
+
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    # Espera antes del reintento: backoff exponencial con jitter completo
+    def delay(self, attempt):
+        return random.uniform(
+            0,
+            min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            )
@@ -1,38 +1,153 @@
+import logging
 import os
+import time
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlencode
 
 # Manejo de errores de la API externa
-from app.exceptions.external_api import ExternalAPIError
+from app.exceptions.external_api import (
+    ExternalAPIError,
+    MissingCharactersError,
+)
+from app.json_provider import loads
+from app.metrics import (
+    CHARACTER_PAGES,
+    UPSTREAM_ERRORS,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_LATENCY,
+    upstream_endpoint,
+)
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.page_parser import character_parser, ijson
+from app.services.retry_budget import RetryBudget
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 # Definicion de constantes
 HUMAN = "Human"
 ALIVE = "Alive"
 DEAD = "Dead"
 
+# Status codes de errores que indican que la API externa esta fallando
+# (y no que el request es incorrecto), y por lo tanto se pueden reintentar
+UPSTREAM_FAILURE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Tamaño de los chunks en los que se lee una respuesta decodificada a medida
+# que llega
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# URL de una pagina de un recurso ("character", "location").
+# Sin pagina es la primera
+def page_url(base_url, resource, page=None):
+    url = f"{base_url}/{resource}"
+    if page is not None:
+        url = f"{url}?{urlencode({'page': page})}"
+    return url
+
+
+# URL de los personajes con los ids indicados (/character/1,2,3)
+def character_ids_url(base_url, ids):
+    return f"{base_url}/character/{','.join(map(str, ids))}"
+
+
+# Ids del lote de personajes numero "batch" (empezando en 1): de
+# (batch - 1) * batch_size + 1 a batch * batch_size, sin pasar de count
+def batch_ids(batch, batch_size, count):
+    return range(
+        (batch - 1) * batch_size + 1,
+        min(batch * batch_size, count) + 1
+        )
+
+
+# URL de busqueda de locaciones con los filtros que se hayan definido
+def location_url(base_url, name=None, type_=None):
+    query = {}
+    if name:
+        query["name"] = name
+    if type_:
+        query["type"] = type_
+
+    return f"{base_url}/location?{urlencode(query)}"
+
+
+# Crea una sesion HTTP con keep-alive y un pool de conexiones por host
+def create_session(pool_size=None):
+    if pool_size is None:
+        pool_size = int(os.getenv("RICK_AND_MORTY_POOL_SIZE", 10))
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Indica si se pidio decodificar las paginas de personajes a medida que
+# llegan (RICK_AND_MORTY_STREAM_PARSING=1) y si ijson esta instalado
+def stream_parsing_enabled():
+    if os.getenv("RICK_AND_MORTY_STREAM_PARSING", "0") != "1":
+        return False
+    if ijson is None:
+        logger.warning(
+            "RICK_AND_MORTY_STREAM_PARSING requires ijson, "
+            "decoding full responses instead"
+            )
+        return False
+    return True
+
 
 class RickAndMortyAPI:
-    def __init__(self):
+    def __init__(self, session=None):
         self.base_url = os.getenv(
             "RICK_AND_MORTY_BASE_URL",
             "https://rickandmortyapi.com/api"
             )
+        # Cantidad maxima de paginas que se piden en paralelo.
+        # Con un valor de 1 se recorren las paginas de forma secuencial
+        self.max_workers = int(os.getenv("RICK_AND_MORTY_MAX_WORKERS", 8))
+        # Personajes por request al descargarlos por lotes de ids
+        # (/character/1,2,3) en vez de recorrer las paginas. Con 0 se
+        # recorren las paginas
+        self.batch_size = int(os.getenv("RICK_AND_MORTY_BATCH_SIZE", 0))
+        # Sesion HTTP compartida. Sin sesion cada request abre su conexion
+        self.session = session
+        # Los requests simultaneos al mismo URL se hacen una sola vez
+        self._single_flight = SingleFlight()
+        # Cortan los requests cuando la API externa esta caida y limitan
+        # los reintentos
+        self.circuit_breaker = CircuitBreaker()
+        self.retry_budget = RetryBudget()
+        # Decodifica las respuestas de personajes a medida que llegan,
+        # guardando solo los campos que usa el servicio. Necesita ijson
+        self.stream_parsing = stream_parsing_enabled()
 
-    def get_all_characters_stats(self):
-        # URL al que se le consulta la informacion de los personajes
-        url = f"{self.base_url}/character"
+    # Cierra las conexiones abiertas por la sesion
+    def close(self):
+        if self.session is not None:
+            self.session.close()
 
+    def get_all_characters_stats(self):
         # Diccionario que almacenara el total final
-        character_stats = {
-            "character_names": [],
-            "human_count": 0,
-            "not_human_count": 0,
-            "dead_count": 0,
-            "alive_count": 0,
-        }
+        character_stats = self.empty_character_stats()
 
-        while url:
-            response = self._get(url)
+        pages = 0
+        for extracted_char_stats in self.iter_characters_stats():
+            # Sumo los restultados de esta pagina al agregado total
+            self.add_character_stats(character_stats, extracted_char_stats)
+            pages += 1
+
+        CHARACTER_PAGES.observe(pages)
+        return character_stats
+
+    # Generador con los stats de cada pagina de personajes, en orden
+    def iter_characters_stats(self):
+        for response in self.iter_all_pages("character"):
             # Podria haber agregado todos los personajes dentro de una variable
             # y despues calcular los stats pero preferi calcular los stats por
             # pagina ya que desconozco el tamaño de la lista completa
@@ -40,29 +155,145 @@ class RickAndMortyAPI:
             request_result = response.get("results", [])
 
             # extraigo la informacion que necesito de la respuesta al request
-            extracted_char_stats = self.extract_character_stats(request_result)
+            yield self.extract_character_stats(request_result)
 
-            # Sumo los restultados de esta pagina al agregado total
-            character_stats["character_names"] += extracted_char_stats.get(
-                "character_names", []
-                )
-            character_stats["human_count"] += extracted_char_stats.get(
-                "human_count", 0
-                )
-            character_stats["not_human_count"] += extracted_char_stats.get(
-                "not_human_count", 0
-                )
-            character_stats["dead_count"] += extracted_char_stats.get(
-                "dead_count", 0
-                )
-            character_stats["alive_count"] += extracted_char_stats.get(
-                "alive_count", 0
-                )
+    # Generador que devuelve todas las paginas de un recurso en orden
+    def iter_all_pages(self, resource):
+        response = self.get_page(resource)
+        yield response
+
+        # Si la API informa la cantidad de paginas, pido el resto en paralelo
+        pages = response.get("info", {}).get("pages")
+        if self.max_workers > 1 and isinstance(pages, int) and pages > 1:
+            yield from self.iter_pages(resource, range(2, pages + 1))
+            return
 
-            # Redefino el URL al URL de la proxima pagina
-            # (el cual la API almacena en el argumento "next")
+        # Si no, recorro las paginas secuencialmente.
+        # Redefino el URL al URL de la proxima pagina
+        # (el cual la API almacena en el argumento "next")
+        url = response.get("info", {}).get("next")
+        while url:
+            response = self._get(url)
+            yield response
             url = response.get("info", {}).get("next")
 
+    # Devuelve una pagina de un recurso (sin pagina es la primera)
+    def get_page(self, resource, page=None):
+        return self._get(page_url(self.base_url, resource, page))
+
+    # Devuelve las paginas pedidas de un recurso, en orden
+    def iter_pages(self, resource, pages):
+        return self._get_all(
+            [page_url(self.base_url, resource, page) for page in pages]
+            )
+
+    # Devuelve la lista de personajes de cada lote de ids pedido (ver
+    # batch_ids), en orden y ordenada por id. Levanta MissingCharactersError
+    # si la API externa no devuelve exactamente los ids del lote
+    def iter_character_batches(self, count, batches):
+        id_lists = [
+            list(batch_ids(batch, self.batch_size, count))
+            for batch in batches
+        ]
+        responses = self._get_all(
+            [character_ids_url(self.base_url, ids) for ids in id_lists]
+            )
+
+        try:
+            for ids, response in zip(id_lists, responses):
+                yield self._characters_by_id(response, ids)
+
+        # Un lote de un unico id que no existe responde 404
+        except MissingCharactersError:
+            raise
+        except ExternalAPIError as e:
+            if e.status_code != 404:
+                raise
+            raise MissingCharactersError("Missing character ids") from e
+
+    # Ordena la respuesta a /character/{ids} segun los ids pedidos
+    @staticmethod
+    def _characters_by_id(response, ids):
+        # Con un unico id la API externa devuelve el personaje, no una lista
+        if isinstance(response, dict):
+            response = [response]
+        if not isinstance(response, list):
+            raise ExternalAPIError(
+                "Invalid JSON response",
+                status_code=502
+                )
+
+        characters = {
+            character.get("id"): character
+            for character in response
+            if isinstance(character, dict)
+        }
+        if len(response) != len(ids) or not all(
+            character_id in characters for character_id in ids
+        ):
+            raise MissingCharactersError("Missing character ids")
+        return [characters[character_id] for character_id in ids]
+
+    # Pide los URLs (en paralelo si max_workers lo permite) y devuelve las
+    # respuestas en el mismo orden
+    def _get_all(self, urls):
+        if self.max_workers > 1 and len(urls) > 1:
+            yield from self._get_concurrently(urls)
+        else:
+            for url in urls:
+                yield self._get(url)
+
+    # Pide todos los URLs en paralelo y devuelve las respuestas en el mismo
+    # orden en el que fueron pedidas. Solo se piden hasta 2 * max_workers
+    # URLs por delante del que se esta devolviendo, asi si el consumidor es
+    # lento (por ejemplo un export enviandose al cliente) no se acumulan
+    # todas las respuestas en memoria
+    def _get_concurrently(self, urls):
+        workers = min(self.max_workers, len(urls))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            pending_urls = iter(urls)
+            futures = deque(
+                executor.submit(self._get, url)
+                for url in islice(pending_urls, 2 * workers)
+            )
+            while futures:
+                result = futures.popleft().result()
+                for url in islice(pending_urls, 1):
+                    futures.append(executor.submit(self._get, url))
+                yield result
+        finally:
+            # Si una pagina falla no espero a las que quedan pendientes
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def empty_character_stats():
+        return {
+            "character_names": [],
+            "human_count": 0,
+            "not_human_count": 0,
+            "dead_count": 0,
+            "alive_count": 0,
+        }
+
+    # Suma los stats de una pagina al agregado total
+    @staticmethod
+    def add_character_stats(character_stats, extracted_char_stats):
+        character_stats["character_names"] += extracted_char_stats.get(
+            "character_names", []
+            )
+        character_stats["human_count"] += extracted_char_stats.get(
+            "human_count", 0
+            )
+        character_stats["not_human_count"] += extracted_char_stats.get(
+            "not_human_count", 0
+            )
+        character_stats["dead_count"] += extracted_char_stats.get(
+            "dead_count", 0
+            )
+        character_stats["alive_count"] += extracted_char_stats.get(
+            "alive_count", 0
+            )
         return character_stats
 
     # Metodo opara extraer la informacion que necesito
@@ -100,15 +331,12 @@ class RickAndMortyAPI:
         }
 
     def get_location_by_name_and_type(self, name=None, type_=None):
-        query = {}
-        if name:
-            query["name"] = name
-        if type_:
-            query["type"] = type_
-
-        url = f"{self.base_url}/location?{urlencode(query)}"
-        response = self._get(url)
+        response = self._get(location_url(self.base_url, name, type_))
+        return self.first_location(response)
 
+    # Devuelve la primera locacion de la respuesta de la API externa
+    @staticmethod
+    def first_location(response):
         if not response.get("results"):
             raise ExternalAPIError(
                 "No matching location found",
@@ -125,10 +353,67 @@ class RickAndMortyAPI:
 
         return result
 
-    @staticmethod
-    def _get(url):
+    # Si ya hay un request en curso al mismo URL espero su resultado
+    # en vez de hacer otro
+    def _get(self, url):
+        return self._single_flight.do(url, lambda: self._fetch(url))
+
+    # Hace el request pasando por el circuit breaker. Los errores de la API
+    # externa se reintentan mientras lo permita el presupuesto de reintentos
+    def _fetch(self, url):
+        self.retry_budget.deposit()
+        attempt = 0
+
+        while True:
+            self.circuit_breaker.before_call()
+            try:
+                result = self._timed_request(url)
+
+            except ExternalAPIError as e:
+                UPSTREAM_ERRORS.labels(status_code=e.status_code).inc()
+                if e.status_code not in UPSTREAM_FAILURE_STATUS_CODES:
+                    # La API externa respondio, el error es del request
+                    self.circuit_breaker.record_success()
+                    raise
+
+                self.circuit_breaker.record_failure(
+                    timeout=e.status_code == 504
+                    )
+                attempt += 1
+                if not self.retry_budget.can_retry(attempt):
+                    raise
+                time.sleep(self.retry_budget.delay(attempt))
+                continue
+
+            self.circuit_breaker.record_success()
+            return result
+
+    # Hace el request midiendo su duracion
+    def _timed_request(self, url):
+        endpoint = upstream_endpoint(self.base_url, url)
+        UPSTREAM_IN_FLIGHT.inc()
+        start = time.perf_counter()
         try:
-            response = requests.get(url, timeout=10)
+            return self._request(url)
+        finally:
+            UPSTREAM_LATENCY.labels(endpoint=endpoint).observe(
+                time.perf_counter() - start
+                )
+            UPSTREAM_IN_FLIGHT.dec()
+
+    def _request(self, url):
+        http = self.session if self.session is not None else requests
+        # Las respuestas de personajes se pueden decodificar a medida que
+        # llegan, el resto se decodifica completo
+        parse = (
+            character_parser(self.base_url, url)
+            if self.stream_parsing else None
+            )
+        try:
+            if parse is not None:
+                response = http.get(url, timeout=10, stream=True)
+            else:
+                response = http.get(url, timeout=10)
             response.raise_for_status()
 
         # Si surge un error en el request, levanto una excepcion
@@ -151,11 +436,36 @@ class RickAndMortyAPI:
                 status_code=503
                 )
 
+        if parse is not None:
+            return self._parse_streamed(response, parse)
+
         # Si no ocurrio una excepcion pero el resultado no es JSON valido
         try:
-            return response.json()
+            return loads(response.content)
+        except ValueError:
+            raise ExternalAPIError(
+                "Invalid JSON response",
+                status_code=502
+                )
+
+    # Decodifica una respuesta de personajes a medida que se lee,
+    # guardando solo los campos proyectados
+    def _parse_streamed(self, response, parse):
+        try:
+            return parse(response.iter_content(STREAM_CHUNK_SIZE))
+
         except ValueError:
             raise ExternalAPIError(
                 "Invalid JSON response",
                 status_code=502
                 )
+
+        # La conexion se puede cortar mientras se lee el cuerpo
+        except requests.exceptions.RequestException as e:
+            raise ExternalAPIError(
+                f"External API request failed: {e}",
+                status_code=503
+                )
+
+        finally:
+            response.close()
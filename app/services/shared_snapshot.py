@@ -0,0 +1,180 @@
+import fcntl
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+# Cache de un unico valor compartido entre procesos (los workers de
+# gunicorn) a traves de un archivo.
+#
+# El valor se guarda serializado en "path" y se reemplaza de forma atomica
+# (se escribe un archivo temporal y se renombra), asi un lector nunca ve un
+# archivo a medio escribir. Un unico proceso a la vez recalcula el valor,
+# bajo un lock de archivo (flock sobre "path.lock"); los demas leen el
+# snapshot que escribio. La antiguedad del valor es la del archivo, asi
+# todos los workers ven la misma.
+#
+# Tiene la misma interfaz que StaleWhileRevalidateCache: una vez que el
+# snapshot vence se sigue sirviendo mientras se recalcula en segundo plano.
+# El archivo es un pickle, asi que el directorio no tiene que ser escribible
+# por otros usuarios
+class SharedSnapshotCache:
+    def __init__(self, path, loader, ttl):
+        self.path = path
+        # Funcion que calcula el valor
+        self.loader = loader
+        # Segundos durante los cuales el snapshot se considera fresco
+        self.ttl = ttl
+
+        # _lock protege el estado, _load_lock asegura que haya una sola carga
+        # por proceso (el lock de archivo, una sola entre procesos)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # Ultimo snapshot leido y la identidad del archivo del que salio.
+        # Mientras el archivo no cambie se devuelve el mismo objeto
+        self._value = None
+        self._file_id = None
+        self._refreshing = False
+
+    # Devuelve el valor y su antiguedad en segundos
+    def get(self):
+        snapshot = self._read()
+        if snapshot is not None:
+            value, age = snapshot
+
+            # Si el snapshot vencio lanzo un unico refresh en segundo plano.
+            # Si otro proceso ya lo esta recalculando el refresh no hace nada
+            with self._lock:
+                if age >= self.ttl and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, daemon=True).start()
+            return value, age
+
+        # Sin snapshot el primer request calcula el valor y los demas (de
+        # este proceso o de otros) esperan a que termine y lo leen
+        return self.load(), 0.0
+
+    # Devuelve el snapshot si esta fresco, o lo recalcula y lo devuelve.
+    # Si otro proceso lo esta recalculando espera a que termine
+    def load(self):
+        with self._load_lock, self._file_lock():
+            snapshot = self._read()
+            if snapshot is not None and snapshot[1] < self.ttl:
+                return snapshot[0]
+
+            value = self.loader()
+            self._write(value)
+            return value
+
+    # Devuelve el ultimo snapshot leido (aunque este vencido) sin
+    # calcularlo, o None si este proceso todavia no leyo ninguno
+    def peek(self):
+        with self._lock:
+            return self._value
+
+    # Borra el snapshot, el proximo get lo vuelve a calcular
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._file_id = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    # Lee el snapshot del archivo. Devuelve (valor, antiguedad), o None si
+    # no hay snapshot
+    def _read(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        age = max(time.time() - stat.st_mtime, 0.0)
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if file_id == self._file_id:
+                return self._value, age
+
+        # El archivo cambio: lo vuelvo a leer. Lo abro antes de volver a
+        # mirar su identidad, porque otro proceso puede reemplazarlo en
+        # el medio y el archivo abierto es el que se lee
+        try:
+            with open(self.path, "rb") as snapshot_file:
+                stat = os.fstat(snapshot_file.fileno())
+                value = pickle.load(snapshot_file)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            self._value = value
+            self._file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return value, max(time.time() - stat.st_mtime, 0.0)
+
+    # Escribe el snapshot en un archivo temporal del mismo directorio y lo
+    # renombra sobre el actual
+    def _write(self, value):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                pickle.dump(value, temp_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        # El proceso que escribio el snapshot no lo vuelve a leer
+        stat = os.stat(self.path)
+        with self._lock:
+            self._value = value
+            self._file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    # Lock exclusivo entre procesos. Con blocking=False levanta
+    # BlockingIOError si otro proceso lo tiene
+    @contextmanager
+    def _file_lock(self, blocking=True):
+        lock_path = f"{self.path}.lock"
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+
+        with open(lock_path, "a") as lock_file:
+            flags = fcntl.LOCK_EX
+            if not blocking:
+                flags |= fcntl.LOCK_NB
+            fcntl.flock(lock_file, flags)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        try:
+            with self._load_lock, self._file_lock(blocking=False):
+                # Otro proceso pudo haberlo recalculado mientras tanto
+                snapshot = self._read()
+                if snapshot is None or snapshot[1] >= self.ttl:
+                    self._write(self.loader())
+
+        # Otro proceso esta recalculando el snapshot
+        except BlockingIOError:
+            pass
+
+        # Si falla el refresh se sigue sirviendo el snapshot viejo y se
+        # reintenta en el proximo get
+        except Exception:
+            logger.exception("Shared snapshot refresh failed")
+
+        finally:
+            with self._lock:
+                self._refreshing = False
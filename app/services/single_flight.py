@@ -0,0 +1,44 @@
+import threading
+
+
+# Llamada en curso: los threads que esperan leen de aca el resultado
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Evita ejecutar la misma llamada varias veces al mismo tiempo. El primer
+# thread que pide una clave (el lider) ejecuta la funcion y los que piden la
+# misma clave mientras tanto esperan y reciben su resultado o su excepcion
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Las llamadas que lleguen despues de terminar ejecutan de nuevo
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,278 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app.exceptions.external_api import ExternalAPIError
+from app.services.character_store import CharacterStore
+from app.services.page_parser import CHARACTER_COLUMNS, character_row
+from app.services.rick_and_morty_api import HUMAN, ALIVE, DEAD
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER,
+    name TEXT,
+    species TEXT,
+    status TEXT,
+    gender TEXT,
+    origin TEXT,
+    location TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_characters_species ON characters (species);
+CREATE INDEX IF NOT EXISTS idx_characters_status ON characters (status);
+
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER,
+    name TEXT,
+    type TEXT,
+    dimension TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_locations_name ON locations (name);
+CREATE INDEX IF NOT EXISTS idx_locations_type ON locations (type);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+# Solo guardo strings. Cualquier otro tipo se guarda como NULL, asi los
+# conteos dan lo mismo que extract_character_stats
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+# Escapa los comodines de LIKE para buscar el texto literal
+def _like_pattern(value):
+    escaped = (
+        value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+    return f"%{escaped}%"
+
+
+# Copia local en SQLite de los personajes y las locaciones de la API externa.
+# Responde los mismos metodos que RickAndMortyAPI usando consultas SQL
+class SQLiteMirror:
+    def __init__(self, path, external_api, max_age=None):
+        self.path = path
+        self.external_api = external_api
+        # Segundos despues de los cuales la copia se vuelve a sincronizar
+        if max_age is None:
+            max_age = float(os.getenv("SQLITE_MIRROR_MAX_AGE", 3600))
+        self.max_age = max_age
+
+        self._sync_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._syncing = False
+
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Descarga todos los personajes y locaciones y reemplaza la copia local
+    # en una sola transaccion
+    def sync(self):
+        with self._sync_lock:
+            self._sync()
+
+    # Sincroniza solo si la copia nunca se sincronizo. La verificacion se
+    # repite con _sync_lock tomado, asi los requests que llegan a la vez con
+    # la copia vacia esperan a la primera sincronizacion en vez de repetirla
+    def sync_if_needed(self):
+        with self._sync_lock:
+            if self.synced_at() is None:
+                self._sync()
+
+    # Se llama con _sync_lock tomado
+    def _sync(self):
+        characters = [
+            character_row(character)
+            for response in self.external_api.iter_all_pages("character")
+            for character in response.get("results", [])
+        ]
+        locations = [
+            (
+                location.get("id"),
+                _text(location.get("name")),
+                _text(location.get("type")),
+                _text(location.get("dimension")),
+            )
+            for response in self.external_api.iter_all_pages("location")
+            for location in response.get("results", [])
+        ]
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM characters")
+                connection.executemany(
+                    "INSERT INTO characters VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    characters
+                    )
+                connection.execute("DELETE FROM locations")
+                connection.executemany(
+                    "INSERT INTO locations VALUES (?, ?, ?, ?)",
+                    locations
+                    )
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('synced_at', ?)",
+                    (time.time(),)
+                    )
+        finally:
+            connection.close()
+
+    # Momento (timestamp) de la ultima sincronizacion, None si nunca se hizo
+    def synced_at(self):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT value FROM meta WHERE key = 'synced_at'"
+                ).fetchone()
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    # Politica de frescura: si la copia nunca se sincronizo se sincroniza
+    # antes de responder; si esta vencida se sigue respondiendo con la copia
+    # actual mientras se sincroniza en segundo plano
+    def ensure_fresh(self):
+        synced_at = self.synced_at()
+        if synced_at is None:
+            self.sync_if_needed()
+            return
+
+        if time.time() - synced_at < self.max_age:
+            return
+
+        with self._state_lock:
+            if self._syncing:
+                return
+            self._syncing = True
+        threading.Thread(target=self._background_sync, daemon=True).start()
+
+    def _background_sync(self):
+        try:
+            self.sync()
+        except Exception:
+            logger.exception("SQLite mirror sync failed")
+        finally:
+            self._syncing = False
+
+    def get_all_characters_stats(self):
+        self.ensure_fresh()
+
+        connection = self._connect()
+        try:
+            # Leo los nombres y los conteos de la misma version de la copia
+            connection.execute("BEGIN")
+            # Los nombres vacios se descartan, igual que en
+            # extract_character_stats
+            names = connection.execute(
+                "SELECT name FROM characters "
+                "WHERE name IS NOT NULL AND name <> '' ORDER BY rowid"
+                ).fetchall()
+            counts = connection.execute(
+                """
+                SELECT
+                    COALESCE(SUM(species IS ?), 0),
+                    COALESCE(SUM(species IS NOT ?), 0),
+                    COALESCE(SUM(status IS ?), 0),
+                    COALESCE(SUM(status IS ?), 0)
+                FROM characters
+                """,
+                (HUMAN, HUMAN, DEAD, ALIVE)
+                ).fetchone()
+        finally:
+            connection.close()
+
+        return {
+            "character_names": [name for (name,) in names],
+            "human_count": counts[0],
+            "not_human_count": counts[1],
+            "dead_count": counts[2],
+            "alive_count": counts[3],
+        }
+
+    # CharacterStore con todos los personajes de la copia, para agruparlos
+    def get_character_store(self):
+        self.ensure_fresh()
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT name, species, status, gender, origin "
+                "FROM characters ORDER BY rowid"
+                )
+            return CharacterStore.from_characters(
+                {
+                    "name": name,
+                    "species": species,
+                    "status": status,
+                    "gender": gender,
+                    "origin": {"name": origin},
+                }
+                for name, species, status, gender, origin in rows
+            )
+        finally:
+            connection.close()
+
+    # Personajes de la copia como tuplas (id, name, species, status, gender,
+    # origin, location), en el orden de la API y en listas de hasta
+    # chunk_size filas. La copia se sincroniza antes de devolver el
+    # generador, que lee las filas de a poco con el cursor y abre la
+    # conexion recien cuando se empieza a recorrer
+    def iter_character_rows(self, chunk_size=500):
+        self.ensure_fresh()
+        return self._iter_character_rows(chunk_size)
+
+    def _iter_character_rows(self, chunk_size):
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                f"SELECT {', '.join(CHARACTER_COLUMNS)} "
+                "FROM characters ORDER BY rowid"
+                )
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
+        finally:
+            connection.close()
+
+    # Misma semantica que el filtro de la API externa: los filtros buscan
+    # el texto en cualquier parte del campo sin distinguir mayusculas, y se
+    # devuelve la primera locacion en el orden de la API
+    def get_location_by_name_and_type(self, name=None, type_=None):
+        self.ensure_fresh()
+
+        query = "SELECT name, type, dimension FROM locations WHERE 1 = 1"
+        params = []
+        if name:
+            query += " AND name LIKE ? ESCAPE '\\'"
+            params.append(_like_pattern(name))
+        if type_:
+            query += " AND type LIKE ? ESCAPE '\\'"
+            params.append(_like_pattern(type_))
+        query += " ORDER BY rowid LIMIT 1"
+
+        connection = self._connect()
+        try:
+            row = connection.execute(query, params).fetchone()
+        finally:
+            connection.close()
+
+        if row is None:
+            raise ExternalAPIError(
+                "No matching location found",
+                status_code=404
+                )
+
+        return {"name": row[0], "type": row[1], "dimension": row[2]}
@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Precalienta los datos de la app antes de que reciba trafico, corriendo
+# cada paso (una funcion sin argumentos) en orden. Si un paso falla (por
+# ejemplo porque la API externa no responde) se reintenta todo cada
+# retry_interval segundos hasta que termina.
+#
+# Con gunicorn cada worker se precalienta por su cuenta. Para que un
+# worker no informe que esta listo mientras los demas siguen frios, cada
+# uno deja una marca (un archivo con su pid) en ready_dir al terminar, y
+# la app se considera lista recien cuando hay "workers" marcas.
+# gunicorn.conf.py define WARMUP_READY_DIR y WARMUP_WORKERS, y borra la
+# marca de los workers que terminan
+class WarmUp:
+    def __init__(self, steps, retry_interval=None, ready_dir=None,
+                 workers=None):
+        self.steps = steps
+        if retry_interval is None:
+            retry_interval = float(os.getenv("WARMUP_RETRY_INTERVAL", 5))
+        self.retry_interval = retry_interval
+        if ready_dir is None:
+            ready_dir = os.getenv("WARMUP_READY_DIR") or None
+        self.ready_dir = ready_dir
+        if workers is None:
+            workers = int(os.getenv("WARMUP_WORKERS", 1))
+        self.workers = workers
+
+        # Ultimo error del warm-up, para informarlo en /readyz
+        self.error = None
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Indica si termino el warm-up de este proceso y, si se comparten las
+    # marcas, el de todos los workers
+    @property
+    def ready(self):
+        if not self._done.is_set():
+            return False
+        if self.ready_dir is None:
+            return True
+        try:
+            return len(os.listdir(self.ready_dir)) >= self.workers
+        except FileNotFoundError:
+            return False
+
+    # Marca la app como lista sin precalentar nada
+    def skip(self):
+        self._finish()
+
+    # Corre el warm-up en el thread actual. Devuelve True si termino
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                for step in self.steps:
+                    step()
+            except Exception as e:
+                self.error = str(e)
+                logger.exception("Warm-up failed, retrying")
+                self._stop.wait(self.retry_interval)
+                continue
+
+            self.error = None
+            self._finish()
+            return True
+        return False
+
+    # Corre el warm-up en segundo plano. Si se habia detenido con stop()
+    # vuelve a empezar
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.ready:
+            return
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    # Espera a que termine el warm-up. Devuelve True si termino
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+    def _finish(self):
+        if self.ready_dir is not None:
+            path = os.path.join(self.ready_dir, str(os.getpid()))
+            with open(path, "w"):
+                pass
+        self._done.set()
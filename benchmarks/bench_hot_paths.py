@@ -0,0 +1,320 @@
+"""
+Microbenchmarks for the hot paths of the service.
+
+Measures, over synthetic datasets:
+
+    - extract_character_stats
+    - the page merge loop of get_all_characters_stats
+    - building a CharacterStore and grouping it with count_by
+    - decoding a character page in full vs. streamed with projected fields
+    - JSON serialization of the /characters payload
+    - Flask request overhead of /characters and /location
+
+Usage:
+
+    python -m benchmarks.bench_hot_paths --output bench_results.json
+    python -m benchmarks.bench_hot_paths --sizes 1000,10000 --repeat 3
+
+The results are written as JSON so they can be compared between commits
+with benchmarks/compare.py.
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+from app import create_app
+from app.extensions import CHARACTERS_CACHE, RICK_AND_MORTY_API
+from app.json_provider import dumps, orjson
+from app.services.character_store import CharacterStore
+from app.services.page_parser import character_parser, ijson
+from app.services.rick_and_morty_api import RickAndMortyAPI
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+PAGE_SIZE = 20
+# Personajes por pagina en el benchmark de decodificacion (una pagina de
+# 1M de personajes no es realista)
+MAX_PARSED_PAGE_SIZE = 10_000
+
+SPECIES = ("Human", "Alien", "Humanoid", "Robot", "Animal", None)
+STATUSES = ("Alive", "Dead", "unknown")
+
+
+# Lista de personajes sintetica, con el formato de la API externa. Con
+# full=True tiene tambien los campos que el servicio no usa
+def make_characters(size, full=False):
+    characters = [
+        {
+            "id": i,
+            "name": f"Character {i}",
+            "species": SPECIES[i % len(SPECIES)],
+            "status": STATUSES[i % len(STATUSES)],
+            "gender": "Male" if i % 2 else "Female",
+            "origin": {"name": "Earth (C-137)", "url": ""},
+            "location": {"name": "Citadel of Ricks", "url": ""},
+        }
+        for i in range(1, size + 1)
+    ]
+    if full:
+        for character in characters:
+            character.update({
+                "type": "",
+                "image": f"https://example.com/avatar/{character['id']}.jpeg",
+                "episode": [
+                    f"https://example.com/episode/{episode}"
+                    for episode in range(1, 31)
+                ],
+                "url": f"https://example.com/character/{character['id']}",
+                "created": "2017-11-04T18:48:46.250Z",
+            })
+    return characters
+
+
+# Divide los personajes en paginas de respuesta de la API externa
+def make_pages(characters):
+    pages = max(1, -(-len(characters) // PAGE_SIZE))
+    return [
+        {
+            "info": {"count": len(characters), "pages": pages},
+            "results": characters[start:start + PAGE_SIZE],
+        }
+        for start in range(0, max(1, len(characters)), PAGE_SIZE)
+    ]
+
+
+# Cliente que devuelve paginas en memoria en vez de pedirlas por HTTP
+class InMemoryAPI(RickAndMortyAPI):
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def iter_all_pages(self, resource):
+        return iter(self.pages)
+
+
+# Mide una funcion y devuelve el resultado en el formato de salida
+def measure(name, size, fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [total / number for total in timer.repeat(repeat, number)]
+
+    return {
+        "name": name,
+        "size": size,
+        "number": number,
+        "repeat": repeat,
+        "min_s": min(runs),
+        "median_s": statistics.median(runs),
+        "mean_s": statistics.fmean(runs),
+        "ops_per_s": 1 / min(runs) if min(runs) else None,
+    }
+
+
+# Pico de memoria reservada (en bytes) mientras corre fn
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_extract_character_stats(size, repeat):
+    characters = make_characters(size)
+    return measure(
+        "extract_character_stats",
+        size,
+        lambda: RickAndMortyAPI.extract_character_stats(characters),
+        repeat
+        )
+
+
+def bench_merge_pages(size, repeat):
+    api = InMemoryAPI(make_pages(make_characters(size)))
+    return measure(
+        "get_all_characters_stats_merge",
+        size,
+        api.get_all_characters_stats,
+        repeat
+        )
+
+
+def bench_character_store(size, repeat):
+    characters = make_characters(size)
+    store = CharacterStore.from_characters(characters)
+    return [
+        measure(
+            "character_store_build",
+            size,
+            lambda: CharacterStore.from_characters(characters),
+            repeat
+            ),
+        measure(
+            "character_store_count_by",
+            size,
+            lambda: store.count_by(["species", "status"]),
+            repeat
+            ),
+    ]
+
+
+def bench_page_parsing(size, repeat):
+    page_size = min(size, MAX_PARSED_PAGE_SIZE)
+    body = json.dumps({
+        "info": {"count": page_size, "pages": 1},
+        "results": make_characters(page_size, full=True),
+    }).encode()
+    chunks = [body[i:i + 65536] for i in range(0, len(body), 65536)]
+
+    parsers = [("page_parse_full", lambda: json.loads(body))]
+    if ijson is not None:
+        parse = character_parser("", "/character")
+        parsers.append((
+            "page_parse_streamed_projected",
+            lambda: parse(chunks)
+            ))
+
+    results = []
+    for name, fn in parsers:
+        result = measure(name, page_size, fn, repeat)
+        result["peak_bytes"] = peak_memory(fn)
+        results.append(result)
+    return results
+
+
+def bench_json(size, repeat):
+    payload = RickAndMortyAPI.extract_character_stats(make_characters(size))
+    results = [
+        measure(
+            "json_stdlib_characters_payload",
+            size,
+            lambda: json.dumps(
+                payload,
+                sort_keys=True,
+                separators=(",", ":")
+                ),
+            repeat
+            ),
+    ]
+    if orjson is not None:
+        results.append(measure(
+            "json_provider_characters_payload",
+            size,
+            lambda: dumps(payload),
+            repeat
+            ))
+    return results
+
+
+# Overhead de Flask: las fuentes de datos se reemplazan por datos en memoria
+def make_bench_app(stats):
+    app = create_app()
+    app.extensions[CHARACTERS_CACHE].loader = lambda: stats
+    app.extensions[RICK_AND_MORTY_API].get_location_by_name_and_type = (
+        lambda name=None, type_=None: {"name": "Earth", "type": "Planet"}
+        )
+    return app
+
+
+def bench_flask_characters(size, repeat):
+    stats = RickAndMortyAPI.extract_character_stats(make_characters(size))
+    client = make_bench_app(stats).test_client()
+    return [
+        measure(
+            "flask_get_characters",
+            size,
+            lambda: client.get("/characters"),
+            repeat
+            ),
+        measure(
+            "flask_get_characters_gzip",
+            size,
+            lambda: client.get(
+                "/characters",
+                headers={"Accept-Encoding": "gzip"}
+                ),
+            repeat
+            ),
+    ]
+
+
+# /location no depende del tamano del dataset, se mide una sola vez
+def bench_flask_location(repeat):
+    client = make_bench_app(None).test_client()
+    return measure(
+        "flask_get_location",
+        None,
+        lambda: client.get("/location?name=earth&type=planet"),
+        repeat
+        )
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5):
+    results = []
+    for size in sizes:
+        results.append(bench_extract_character_stats(size, repeat))
+        results.append(bench_merge_pages(size, repeat))
+        results += bench_character_store(size, repeat)
+        results += bench_page_parsing(size, repeat)
+        results += bench_json(size, repeat)
+        results += bench_flask_characters(size, repeat)
+    results.append(bench_flask_location(repeat))
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True
+            ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma separated dataset sizes (number of characters)"
+        )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--output",
+        help="file where the JSON results are written (default: stdout)"
+        )
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.datetime.now(
+                datetime.timezone.utc
+                ).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "orjson": orjson is not None,
+        },
+        "results": run_benchmarks(sizes, args.repeat),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compares two result files of benchmarks/bench_hot_paths.py.
+
+Usage:
+
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+
+Prints the relative change of every benchmark (by its min time) and exits
+with status 1 if any of them got slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path) as file:
+        report = json.load(file)
+    return {
+        (result["name"], result["size"]): result["min_s"]
+        for result in report["results"]
+    }
+
+
+# Lista de (nombre, tamano, antes, despues, cambio relativo) de los
+# benchmarks presentes en los dos archivos
+def compare(before, after):
+    return [
+        (name, size, before[name, size], after[name, size],
+         after[name, size] / before[name, size] - 1)
+        for name, size in before
+        if (name, size) in after and before[name, size]
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown that counts as a regression (default: 0.1)"
+        )
+    args = parser.parse_args(argv)
+
+    regressions = 0
+    for name, size, before, after, change in compare(
+        _load(args.before),
+        _load(args.after)
+    ):
+        regression = change > args.threshold
+        regressions += regression
+        print(
+            f"{name:<36} {str(size):>9} {before * 1e3:>12.4f}ms "
+            f"{after * 1e3:>12.4f}ms {change:>+8.1%}"
+            f"{'  REGRESSION' if regression else ''}"
+            )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Local fake of the Rick and Morty API, to use as RICK_AND_MORTY_BASE_URL.
+
+Serves synthetic data with the same format as the real API:
+
+    GET /api/character?page=N            paginated characters
+    GET /api/character/1,2,3             characters by id
+    GET /api/location?name=&type=&page=  filtered, paginated locations
+
+Dataset size, page size, latency, jitter and error injection can be
+configured. Usage:
+
+    python -m benchmarks.fake_upstream --port 8001 --latency 0.05
+    RICK_AND_MORTY_BASE_URL=http://127.0.0.1:8001/api flask --app run run
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from benchmarks.bench_hot_paths import make_characters
+
+LOCATION_TYPES = ("Planet", "Space station", "Microverse", "Dimension")
+
+
+@dataclass
+class FakeUpstreamConfig:
+    characters: int = 826
+    locations: int = 126
+    page_size: int = 20
+    # Segundos de demora de cada respuesta, mas una demora aleatoria de
+    # hasta jitter segundos
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Proporcion de requests que responden error_status
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int = 0
+
+
+# Lista de locaciones sintetica, con el formato de la API externa
+def make_locations(size):
+    return [
+        {
+            "id": i,
+            "name": "Earth (C-137)" if i == 1 else f"Location {i}",
+            "type": LOCATION_TYPES[(i - 1) % len(LOCATION_TYPES)],
+            "dimension": f"Dimension {i % 7}",
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeRickAndMorty/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        upstream = self.server.upstream
+        upstream.wait()
+
+        if upstream.inject_error():
+            return self._send(
+                upstream.config.error_status,
+                {"error": "Injected error"}
+                )
+
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.rstrip("/").split("/")
+        status, body = 404, {"error": "There is nothing here"}
+
+        if parts[:2] == ["", "api"] and len(parts) in (3, 4):
+            resource = parts[2]
+            if resource == "character" and len(parts) == 4:
+                status, body = upstream.characters_by_id(parts[3])
+            elif resource == "character":
+                status, body = upstream.page(
+                    "character",
+                    upstream.characters,
+                    query
+                    )
+            elif resource == "location" and len(parts) == 3:
+                status, body = upstream.page(
+                    "location",
+                    upstream.filter_locations(query),
+                    query
+                    )
+
+        self._send(status, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# Servidor HTTP con los datos sinteticos. Corre en un thread propio
+class FakeUpstream:
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeUpstreamConfig()
+        self.characters = make_characters(self.config.characters)
+        self.locations = make_locations(self.config.locations)
+        self._random = random.Random(self.config.seed)
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.upstream = self
+        self._thread = None
+
+    # URL base a usar como RICK_AND_MORTY_BASE_URL
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+            )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Demora de la respuesta
+    def wait(self):
+        delay = self.config.latency
+        if self.config.jitter:
+            delay += self._random.uniform(0, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def inject_error(self):
+        return self._random.random() < self.config.error_rate
+
+    # Pagina de una lista de resultados, como la devuelve la API externa
+    def page(self, resource, results, query):
+        if not results:
+            return 404, {"error": "There is nothing here"}
+
+        try:
+            page = int(query.get("page", 1))
+        except ValueError:
+            page = 1
+        pages = math.ceil(len(results) / self.config.page_size)
+        if not 1 <= page <= pages:
+            return 404, {"error": "There is nothing here"}
+
+        def link(number):
+            if not 1 <= number <= pages:
+                return None
+            params = dict(query)
+            params["page"] = number
+            return f"{self.base_url}/{resource}?{urlencode(params)}"
+
+        start = (page - 1) * self.config.page_size
+        return 200, {
+            "info": {
+                "count": len(results),
+                "pages": pages,
+                "next": link(page + 1),
+                "prev": link(page - 1),
+            },
+            "results": results[start:start + self.config.page_size],
+        }
+
+    # Un id devuelve el personaje, una lista de ids devuelve una lista
+    def characters_by_id(self, ids):
+        try:
+            numbers = [int(number) for number in ids.split(",") if number]
+        except ValueError:
+            return 500, {"error": "Hey! you must provide an id"}
+
+        found = [
+            self.characters[number - 1]
+            for number in numbers
+            if 1 <= number <= len(self.characters)
+        ]
+        if "," in ids:
+            return 200, found
+        if not found:
+            return 404, {"error": "Character not found"}
+        return 200, found[0]
+
+    # Filtro parcial sin distinguir mayusculas, igual que la API externa
+    def filter_locations(self, query):
+        name = query.get("name", "").lower()
+        type_ = query.get("type", "").lower()
+        return [
+            location
+            for location in self.locations
+            if name in location["name"].lower()
+            and type_ in location["type"].lower()
+        ]
+
+
+def main(argv=None):
+    defaults = FakeUpstreamConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--characters", type=int, default=defaults.characters)
+    parser.add_argument("--locations", type=int, default=defaults.locations)
+    parser.add_argument("--page-size", type=int, default=defaults.page_size)
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=defaults.error_rate
+        )
+    parser.add_argument(
+        "--error-status",
+        type=int,
+        default=defaults.error_status
+        )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    config = FakeUpstreamConfig(
+        characters=args.characters,
+        locations=args.locations,
+        page_size=args.page_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+        )
+    upstream = FakeUpstream(config, args.host, args.port)
+    print(f"Serving fake upstream on {upstream.base_url}", flush=True)
+    try:
+        upstream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        upstream.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
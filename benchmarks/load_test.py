@@ -0,0 +1,249 @@
+"""
+End-to-end load test of the app served by gunicorn.
+
+Starts the fake upstream (benchmarks/fake_upstream.py) unless --upstream-url
+is given, starts gunicorn with RICK_AND_MORTY_BASE_URL pointing to it and
+sends requests from several concurrent clients. Reports throughput and
+p50/p95/p99 latency per path as JSON. Usage:
+
+    python -m benchmarks.load_test --duration 10 --concurrency 16
+    python -m benchmarks.load_test --path /characters --latency 0.05 \\
+        --env CHARACTERS_CACHE_TTL=0 --output load.json
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+import requests
+
+from benchmarks.fake_upstream import FakeUpstream, FakeUpstreamConfig
+
+DEFAULT_PATHS = ("/characters", "/location?name=earth&type=planet")
+
+
+# Percentil por rango mas cercano de una lista ordenada
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Inicia gunicorn y espera a que responda
+def start_gunicorn(port, upstream_url, workers, threads, env=None):
+    process_env = dict(os.environ, RICK_AND_MORTY_BASE_URL=upstream_url)
+    process_env.update(env or {})
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "run:app",
+        ],
+        env=process_env,
+        )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited before accepting requests")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+    process.terminate()
+    raise RuntimeError("gunicorn did not start in time")
+
+
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# Cada cliente manda requests a los paths en ronda hasta que vence el tiempo.
+# Devuelve {path: [(latencia, status code), ...]}
+def run_load(base_url, paths, concurrency, duration):
+    samples = {path: [] for path in paths}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        session = requests.Session()
+        local = {path: [] for path in paths}
+        index = offset
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(base_url + path, timeout=30)
+                status_code = response.status_code
+            except requests.RequestException:
+                status_code = None
+            local[path].append((time.perf_counter() - start, status_code))
+
+        session.close()
+        with lock:
+            for path, values in local.items():
+                samples[path].extend(values)
+
+    threads = [
+        threading.Thread(target=client, args=(offset,))
+        for offset in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples
+
+
+# Throughput y percentiles de latencia (en segundos) de cada path
+def summarize(samples, duration):
+    summary = {}
+    for path, values in samples.items():
+        latencies = sorted(latency for latency, _ in values)
+        status_codes = {}
+        for _, status_code in values:
+            key = str(status_code)
+            status_codes[key] = status_codes.get(key, 0) + 1
+
+        summary[path] = {
+            "requests": len(values),
+            "throughput_rps": len(values) / duration,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "p99_s": percentile(latencies, 99),
+            "max_s": latencies[-1] if latencies else None,
+            "status_codes": status_codes,
+        }
+    return summary
+
+
+def _parse_env(values):
+    env = {}
+    for value in values:
+        key, separator, setting = value.partition("=")
+        if not separator:
+            raise argparse.ArgumentTypeError(f"Invalid --env value: {value}")
+        env[key] = setting
+    return env
+
+
+def main(argv=None):
+    defaults = FakeUpstreamConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--path",
+        action="append",
+        help="path to request, can be repeated (default: both routes)"
+        )
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        help="KEY=VALUE environment variable for the app, can be repeated"
+        )
+    parser.add_argument(
+        "--upstream-url",
+        help="external API to use instead of starting the fake upstream"
+        )
+    parser.add_argument("--characters", type=int, default=defaults.characters)
+    parser.add_argument("--page-size", type=int, default=defaults.page_size)
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=defaults.error_rate
+        )
+    parser.add_argument(
+        "--output",
+        help="file where the JSON results are written (default: stdout)"
+        )
+    args = parser.parse_args(argv)
+    paths = args.path or list(DEFAULT_PATHS)
+
+    with ExitStack() as stack:
+        upstream_url = args.upstream_url
+        if upstream_url is None:
+            upstream = FakeUpstream(FakeUpstreamConfig(
+                characters=args.characters,
+                page_size=args.page_size,
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                ))
+            stack.enter_context(upstream)
+            upstream_url = upstream.base_url
+
+        port = _free_port()
+        process = start_gunicorn(
+            port,
+            upstream_url,
+            args.workers,
+            args.threads,
+            _parse_env(args.env)
+            )
+        stack.callback(stop_process, process)
+
+        start = time.monotonic()
+        samples = run_load(
+            f"http://127.0.0.1:{port}",
+            paths,
+            args.concurrency,
+            args.duration
+            )
+        elapsed = time.monotonic() - start
+
+    report = {
+        "config": {
+            "paths": paths,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "threads": args.threads,
+            "upstream_url": args.upstream_url,
+            "characters": args.characters,
+            "page_size": args.page_size,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+        },
+        "results": summarize(samples, elapsed),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
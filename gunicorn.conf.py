@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+
+# gunicorn carga este archivo automaticamente desde el directorio de trabajo
+
+
+# Las metricas de Prometheus de cada worker se guardan en
+# PROMETHEUS_MULTIPROC_DIR. Lo vacio al arrancar para no sumar metricas
+# de ejecuciones anteriores
+def on_starting(server):
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+    # Con WARMUP=1 cada worker deja una marca en WARMUP_READY_DIR cuando
+    # termina su warm-up, y /readyz responde 200 recien cuando estan las
+    # de todos los workers. Los workers heredan las variables con el fork
+    if os.getenv("WARMUP", "0") == "1":
+        os.environ["WARMUP_READY_DIR"] = tempfile.mkdtemp(prefix="warmup-")
+        os.environ["WARMUP_WORKERS"] = str(server.cfg.workers)
+
+
+# Descarta los gauges y la marca de warm-up del worker que termino. El
+# worker que lo reemplaza deja su propia marca cuando se precalienta
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+    directory = os.getenv("WARMUP_READY_DIR")
+    if directory:
+        try:
+            os.remove(os.path.join(directory, str(worker.pid)))
+        except FileNotFoundError:
+            pass
+
+
+def on_exit(server):
+    directory = os.getenv("WARMUP_READY_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
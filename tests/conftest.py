@@ -1,3 +1,4 @@
+import json
 import requests
 
 
@@ -9,6 +10,23 @@ class MockResponse:
         self.raise_http = raise_http
         self.is_json = is_json
 
+    # Cuerpo del response en bytes, como lo devuelve requests
+    @property
+    def content(self):
+        if not self.is_json:
+            return str(self._data).encode()
+        return json.dumps(self._data).encode()
+
+    # Cuerpo del response en chunks, como response.iter_content con
+    # stream=True
+    def iter_content(self, chunk_size=1):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
     # metodo response.json para ver la data del response
     def json(self):
         if not self.is_json:
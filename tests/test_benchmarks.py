@@ -0,0 +1,64 @@
+import json
+import timeit
+from unittest.mock import patch
+from benchmarks import bench_hot_paths, compare
+from app.services.rick_and_morty_api import RickAndMortyAPI
+
+
+# region datos sinteticos
+
+# El merge de las paginas da lo mismo que procesar todos los personajes juntos
+def test_synthetic_pages_merge_to_same_stats():
+    characters = bench_hot_paths.make_characters(45)
+    api = bench_hot_paths.InMemoryAPI(bench_hot_paths.make_pages(characters))
+
+    assert api.get_all_characters_stats() == (
+        RickAndMortyAPI.extract_character_stats(characters)
+        )
+
+# endregion
+
+
+# region ejecucion
+
+# Los benchmarks corren con un dataset chico y generan JSON valido. Sin
+# autorange cada benchmark se ejecuta una sola vez, asi el test no mide
+# tiempos de verdad
+def test_main_writes_json_results(tmp_path):
+    output = tmp_path / "results.json"
+
+    with patch.object(timeit.Timer, "autorange", return_value=(1, 0.0)):
+        bench_hot_paths.main([
+            "--sizes", "10",
+            "--repeat", "1",
+            "--output", str(output)
+            ])
+
+    report = json.loads(output.read_text())
+    names = {result["name"] for result in report["results"]}
+    assert {
+        "extract_character_stats",
+        "get_all_characters_stats_merge",
+        "json_stdlib_characters_payload",
+        "flask_get_characters",
+        "flask_get_location",
+    } <= names
+    assert all(result["min_s"] > 0 for result in report["results"])
+
+
+# compare marca como regresion los benchmarks mas lentos que el umbral
+def test_compare_flags_regressions(tmp_path):
+    def write(path, min_s):
+        path.write_text(json.dumps({"results": [
+            {"name": "bench", "size": 10, "min_s": min_s},
+            ]}))
+        return str(path)
+
+    before = write(tmp_path / "before.json", 1.0)
+    faster = write(tmp_path / "faster.json", 0.9)
+    slower = write(tmp_path / "slower.json", 1.5)
+
+    assert compare.main([before, faster]) == 0
+    assert compare.main([before, slower, "--threshold", "0.1"]) == 1
+
+# endregion
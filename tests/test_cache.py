@@ -0,0 +1,95 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from app.services.cache import StaleWhileRevalidateCache
+
+
+# Espera a que termine el refresh en segundo plano
+def wait_refresh(cache):
+    for _ in range(100):
+        if not cache._refreshing:
+            return
+        time.sleep(0.01)
+
+
+# La primera lectura calcula el valor y las siguientes usan el cache
+def test_cache_loads_once_while_fresh():
+    loader = MagicMock(return_value="value")
+    cache = StaleWhileRevalidateCache(loader, ttl=60)
+
+    assert cache.get() == ("value", 0.0)
+    value, age = cache.get()
+
+    assert value == "value"
+    assert age < 60
+    loader.assert_called_once()
+
+
+# Con el valor vencido se sirve el viejo y se recalcula en segundo plano
+@patch("app.services.cache.time.monotonic")
+def test_cache_serves_stale_and_refreshes(mock_monotonic):
+    mock_monotonic.return_value = 0
+    loader = MagicMock(side_effect=["old", "new"])
+    cache = StaleWhileRevalidateCache(loader, ttl=10)
+    cache.get()
+
+    # Paso el TTL
+    mock_monotonic.return_value = 15
+    value, age = cache.get()
+    assert value == "old"
+    assert age == 15
+
+    wait_refresh(cache)
+    assert cache.get()[0] == "new"
+    assert loader.call_count == 2
+
+
+# Si el refresh falla se sigue sirviendo el valor viejo
+@patch("app.services.cache.time.monotonic")
+def test_cache_keeps_stale_on_refresh_error(mock_monotonic):
+    mock_monotonic.return_value = 0
+    loader = MagicMock(side_effect=["old", Exception("upstream down")])
+    cache = StaleWhileRevalidateCache(loader, ttl=10)
+    cache.get()
+
+    mock_monotonic.return_value = 15
+    cache.get()
+    wait_refresh(cache)
+
+    assert cache.get()[0] == "old"
+
+
+# Con el cache vacio varios requests concurrentes hacen una sola carga
+def test_cache_cold_load_happens_once():
+    started = threading.Event()
+
+    def slow_loader():
+        started.set()
+        time.sleep(0.05)
+        return "value"
+
+    loader = MagicMock(side_effect=slow_loader)
+    cache = StaleWhileRevalidateCache(loader, ttl=60)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get()[0]))
+        for _ in range(5)
+        ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    loader.assert_called_once()
+
+
+# invalidate obliga a recalcular el valor
+def test_cache_invalidate():
+    loader = MagicMock(side_effect=["first", "second"])
+    cache = StaleWhileRevalidateCache(loader, ttl=60)
+
+    assert cache.get()[0] == "first"
+    cache.invalidate()
+    assert cache.get()[0] == "second"
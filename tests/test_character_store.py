@@ -0,0 +1,109 @@
+import pytest
+from app.services.character_store import CharacterStore, new_dictionaries
+from app.services.rick_and_morty_api import RickAndMortyAPI
+
+CHARACTERS = [
+    {"name": "Rick", "species": "Human", "status": "Alive",
+     "gender": "Male", "origin": {"name": "Earth (C-137)"}},
+    {"name": "Birdperson", "species": None, "status": "Dead",
+     "gender": "Male", "origin": {"name": "Bird World"}},
+    {"name": True, "species": "Robot", "status": True},
+    {"name": "", "species": True, "status": "unknown", "gender": "Female"},
+    {"name": "Summer", "species": "Human", "status": 0,
+     "gender": "Female", "origin": {"name": "Earth (C-137)"}},
+    {"name": "Morty", "species": "Human", "status": "Alive",
+     "gender": "Male", "origin": {"name": "Earth (C-137)"}},
+    {"origin": "Earth (C-137)"},
+]
+
+
+# region - Tests for character_stats
+
+# Los contadores del store son iguales a los de extract_character_stats,
+# incluso con datos incompletos o de otro tipo
+def test_character_stats_match_extract():
+    store = CharacterStore.from_characters(CHARACTERS)
+
+    assert len(store) == len(CHARACTERS)
+    assert store.character_stats() == (
+        RickAndMortyAPI.extract_character_stats(CHARACTERS)
+        )
+
+
+def test_character_stats_empty_store():
+    assert CharacterStore().character_stats() == (
+        RickAndMortyAPI.extract_character_stats([])
+        )
+
+
+# Concatenar stores da lo mismo que un store con todos los personajes
+def test_concat_matches_single_store():
+    dictionaries = new_dictionaries()
+    pages = [
+        CharacterStore.from_characters(CHARACTERS[:3], dictionaries),
+        CharacterStore.from_characters(CHARACTERS[3:], dictionaries),
+    ]
+
+    store = CharacterStore.concat(pages, dictionaries)
+
+    single = CharacterStore.from_characters(CHARACTERS)
+    assert store.character_stats() == single.character_stats()
+    assert store.count_by(["species", "status"]) == (
+        single.count_by(["species", "status"])
+        )
+
+
+def test_concat_requires_shared_dictionaries():
+    with pytest.raises(ValueError):
+        CharacterStore.concat(
+            [CharacterStore.from_characters(CHARACTERS)],
+            new_dictionaries()
+            )
+
+# endregion
+
+
+# region - Tests for count_by
+
+def test_count_by_single_column():
+    store = CharacterStore.from_characters(CHARACTERS)
+
+    assert store.count_by(["species"]) == [
+        {"species": "Human", "count": 3},
+        {"species": None, "count": 3},
+        {"species": "Robot", "count": 1},
+    ]
+
+
+# Los grupos se ordenan de mayor a menor y, con la misma cantidad, segun
+# el orden en el que aparecieron los valores de cada columna
+def test_count_by_multiple_columns():
+    store = CharacterStore.from_characters(CHARACTERS)
+
+    assert store.count_by(["origin", "gender"]) == [
+        {"origin": "Earth (C-137)", "gender": "Male", "count": 2},
+        {"origin": None, "gender": None, "count": 2},
+        {"origin": "Earth (C-137)", "gender": "Female", "count": 1},
+        {"origin": "Bird World", "gender": "Male", "count": 1},
+        {"origin": None, "gender": "Female", "count": 1},
+    ]
+
+
+# La suma de los grupos es la cantidad de personajes
+def test_count_by_all_columns_adds_up():
+    store = CharacterStore.from_characters(CHARACTERS)
+
+    groups = store.count_by(["species", "status", "gender", "origin"])
+
+    assert sum(group["count"] for group in groups) == len(CHARACTERS)
+
+
+def test_count_by_invalid_columns():
+    store = CharacterStore.from_characters(CHARACTERS)
+
+    with pytest.raises(ValueError):
+        store.count_by(["name"])
+    with pytest.raises(ValueError):
+        store.count_by([])
+
+# endregion
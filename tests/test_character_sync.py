@@ -0,0 +1,280 @@
+import pytest
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+from app.services.character_sync import CharacterStatsSync
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from conftest import MockResponse
+
+PAGE_SIZE = 2
+
+
+# API externa falsa con paginas de PAGE_SIZE personajes, que tambien
+# responde /character/1,2,3. Los ids de missing_ids no existen
+class FakeUpstream:
+    def __init__(self, names):
+        self.names = names
+        self.missing_ids = set()
+        self.requested_pages = []
+        self.requested_ids = []
+
+    def character(self, character_id):
+        return {
+            "id": character_id,
+            "name": self.names[character_id - 1],
+            "species": "Human",
+            "status": "Alive"
+        }
+
+    def get(self, url, timeout):
+        path = urlparse(url).path
+        if path.startswith("/api/character/"):
+            return self.get_ids(path.rsplit("/", 1)[1])
+
+        page = int(parse_qs(urlparse(url).query).get("page", ["1"])[0])
+        self.requested_pages.append(page)
+
+        pages = max(1, -(-len(self.names) // PAGE_SIZE))
+        start = (page - 1) * PAGE_SIZE
+        return MockResponse({
+            "info": {"count": len(self.names), "pages": pages},
+            "results": [
+                self.character(character_id)
+                for character_id in range(
+                    start + 1,
+                    min(start + PAGE_SIZE, len(self.names)) + 1
+                    )
+                if character_id not in self.missing_ids
+            ]
+        })
+
+    # Igual que la API externa: los ids que no existen se omiten, y un
+    # unico id que no existe responde 404
+    def get_ids(self, ids):
+        ids = [int(character_id) for character_id in ids.split(",")]
+        self.requested_ids.append(ids)
+
+        characters = [
+            self.character(character_id)
+            for character_id in ids
+            if character_id <= len(self.names)
+            and character_id not in self.missing_ids
+        ]
+        if len(ids) > 1:
+            return MockResponse(characters)
+        if characters:
+            return MockResponse(characters[0])
+        return MockResponse(
+            {"error": "Character not found"},
+            status_code=404,
+            raise_http=True
+            )
+
+
+@pytest.fixture
+def upstream():
+    fake = FakeUpstream(["Rick", "Morty", "Summer", "Beth", "Jerry"])
+    with patch(
+            "app.services.rick_and_morty_api.requests.get",
+            side_effect=fake.get
+            ):
+        yield fake
+
+
+@pytest.fixture
+def character_sync():
+    external_api = RickAndMortyAPI()
+    external_api.max_workers = 1
+    return CharacterStatsSync(external_api)
+
+
+# Sincronizacion que pide los personajes en lotes de 3 ids
+@pytest.fixture
+def batch_sync():
+    external_api = RickAndMortyAPI()
+    external_api.max_workers = 1
+    external_api.batch_size = 3
+    return CharacterStatsSync(external_api)
+
+
+# La primera sincronizacion descarga todas las paginas
+def test_first_sync_fetches_all_pages(upstream, character_sync):
+    stats = character_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1, 2, 3]
+    assert stats["character_names"] == [
+        "Rick", "Morty", "Summer", "Beth", "Jerry"
+        ]
+    assert stats["human_count"] == 5
+    assert stats["alive_count"] == 5
+
+
+# Si info.count no cambio solo se pide la primera pagina
+def test_unchanged_sync_fetches_first_page(upstream, character_sync):
+    first = character_sync.get_all_characters_stats()
+    upstream.requested_pages = []
+
+    second = character_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1]
+    assert second == first
+
+
+# Si el dataset crecio se pide la ultima pagina conocida y las nuevas
+def test_grown_sync_fetches_tail(upstream, character_sync):
+    character_sync.get_all_characters_stats()
+    upstream.requested_pages = []
+
+    upstream.names += ["Squanchy", "Birdperson"]
+    stats = character_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1, 3, 4]
+    assert stats["character_names"] == [
+        "Rick", "Morty", "Summer", "Beth", "Jerry", "Squanchy", "Birdperson"
+        ]
+    assert stats["human_count"] == 7
+
+
+# Un cambio dentro de una pagina ya descargada (con el mismo info.count) se
+# ve recien en la proxima sincronizacion completa, que se hace cada
+# full_resync_interval segundos
+@patch("app.services.character_sync.time.monotonic")
+def test_in_place_change_full_resync(mock_monotonic, upstream, character_sync):
+    mock_monotonic.return_value = 0
+    character_sync.full_resync_interval = 100
+    character_sync.get_all_characters_stats()
+
+    upstream.names[3] = "Beth Smith"
+    mock_monotonic.return_value = 50
+    stats = character_sync.get_all_characters_stats()
+    assert "Beth Smith" not in stats["character_names"]
+
+    upstream.requested_pages = []
+    mock_monotonic.return_value = 100
+    stats = character_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1, 2, 3]
+    assert stats["character_names"][3] == "Beth Smith"
+
+    # El intervalo se vuelve a contar desde la sincronizacion completa
+    upstream.requested_pages = []
+    mock_monotonic.return_value = 150
+    character_sync.get_all_characters_stats()
+    assert upstream.requested_pages == [1]
+
+
+def test_full_resync_interval_from_env(monkeypatch):
+    monkeypatch.setenv("CHARACTERS_FULL_RESYNC_INTERVAL", "60")
+
+    assert CharacterStatsSync(RickAndMortyAPI()).full_resync_interval == 60
+
+
+# El store de la sincronizacion incremental tiene todos los personajes
+def test_grown_sync_store(upstream, character_sync):
+    character_sync.get_character_store()
+    upstream.names += ["Squanchy"]
+
+    store = character_sync.get_character_store()
+
+    assert len(store) == 6
+    assert store.count_by(["species"]) == [{"species": "Human", "count": 6}]
+
+
+# Si el dataset se achico se vuelve a pedir todo
+def test_shrunk_sync_fetches_all_pages(upstream, character_sync):
+    character_sync.get_all_characters_stats()
+    upstream.requested_pages = []
+
+    upstream.names = ["Rick", "Morty", "Summer"]
+    stats = character_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1, 2]
+    assert stats["character_names"] == ["Rick", "Morty", "Summer"]
+
+
+# reset obliga a una sincronizacion completa
+def test_reset_fetches_all_pages(upstream, character_sync):
+    character_sync.get_all_characters_stats()
+    upstream.requested_pages = []
+
+    character_sync.reset()
+    character_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1, 2, 3]
+
+
+# Sin info.count ni info.pages se recorre toda la paginacion
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_sync_without_pagination_info(mock_get, character_sync):
+    page = MockResponse({
+        "info": {"next": None},
+        "results": [{"name": "Rick", "species": "Human", "status": "Dead"}]
+    })
+    mock_get.return_value = page
+
+    stats = character_sync.get_all_characters_stats()
+
+    assert stats["character_names"] == ["Rick"]
+    assert stats["dead_count"] == 1
+
+
+# region - Tests for the batch sync
+
+# Con batch_size se pide la primera pagina (por info.count) y despues los
+# ids en lotes, con el mismo resultado que recorriendo las paginas
+def test_batch_sync_matches_page_walk(upstream, batch_sync, character_sync):
+    stats = batch_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1]
+    assert upstream.requested_ids == [[1, 2, 3], [4, 5]]
+    assert stats == character_sync.get_all_characters_stats()
+
+
+# Si info.count no cambio solo se pide la primera pagina
+def test_batch_sync_unchanged(upstream, batch_sync):
+    first = batch_sync.get_all_characters_stats()
+    upstream.requested_pages = []
+    upstream.requested_ids = []
+
+    second = batch_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1]
+    assert upstream.requested_ids == []
+    assert second == first
+
+
+# Si el dataset crecio se pide el ultimo lote conocido y los nuevos
+def test_batch_sync_grown(upstream, batch_sync):
+    batch_sync.get_all_characters_stats()
+    upstream.requested_ids = []
+
+    upstream.names += ["Squanchy", "Birdperson"]
+    store = batch_sync.get_character_store()
+
+    assert upstream.requested_ids == [[4, 5, 6], [7]]
+    assert store.character_stats()["character_names"] == [
+        "Rick", "Morty", "Summer", "Beth", "Jerry", "Squanchy", "Birdperson"
+        ]
+
+
+# Si faltan ids se vuelve a recorrer las paginas, y no se vuelve a pedir
+# por ids
+@pytest.mark.parametrize("missing_ids", [{2}, {5}])
+def test_batch_sync_missing_ids_walks_pages(
+        upstream,
+        batch_sync,
+        character_sync,
+        missing_ids
+        ):
+    upstream.missing_ids = missing_ids
+
+    stats = batch_sync.get_all_characters_stats()
+
+    assert upstream.requested_pages == [1, 2, 3]
+    assert stats == character_sync.get_all_characters_stats()
+
+    upstream.requested_ids = []
+    batch_sync.reset()
+    batch_sync.get_all_characters_stats()
+    assert upstream.requested_ids == []
+
+# endregion
@@ -1,9 +1,29 @@
+import csv
+import gzip
+import io
+import json
 import pytest
 from unittest.mock import patch
 from flask import Flask
 from app.routes.characters import characters_bp
 from app.exceptions.external_api import ExternalAPIError
 from app.error_handlers import register_error_handlers
+from app.services.character_store import CharacterStore
+
+# Metodo del service que se mockea en los tests
+STATS_METHOD = (
+    "app.services.character_sync.CharacterStatsSync.get_all_characters_stats"
+    )
+STORE_METHOD = (
+    "app.services.character_sync.CharacterStatsSync.get_character_store"
+    )
+PAGES_METHOD = (
+    "app.services.rick_and_morty_api.RickAndMortyAPI.iter_characters_stats"
+    )
+ALL_PAGES_METHOD = (
+    "app.services.rick_and_morty_api.RickAndMortyAPI.iter_all_pages"
+    )
+NDJSON_HEADERS = {"Accept": "application/x-ndjson"}
 
 
 # creo el cliente sobre el que se ejecutaran las pruebas
@@ -29,9 +49,7 @@ def test_characters_success(client):
 
     # No uso el decorador por que poner 'mock_stats' como parametro
     # para definir el return value queda feo
-    with patch(
-            "app.routes.characters.RickAndMortyAPI.get_all_characters_stats"
-            ) as mock_stats_method:
+    with patch(STATS_METHOD) as mock_stats_method:
 
         # Defino el return value del metodo get_all_characters_stats
         mock_stats_method.return_value = mock_stats
@@ -63,9 +81,7 @@ def test_characters_success_empty(client):
     }
 
     # mockeo el metodo get_all_characters_stats
-    with patch(
-            "app.routes.characters.RickAndMortyAPI.get_all_characters_stats"
-            ) as mock_stats_method:
+    with patch(STATS_METHOD) as mock_stats_method:
 
         # Defino el return value del metodo get_all_characters_stats
         mock_stats_method.return_value = mock_stats
@@ -88,9 +104,7 @@ def test_characters_success_empty(client):
 
 # Endpoint falla por que la api externa no esta disponible
 def test_characters_external_api_failure(client):
-    with patch(
-            "app.routes.characters.RickAndMortyAPI.get_all_characters_stats"
-            ) as mock_stats_method:
+    with patch(STATS_METHOD) as mock_stats_method:
 
         # Defino el error del metodo get_all_characters_stats
         mock_stats_method.side_effect = ExternalAPIError(
@@ -107,3 +121,540 @@ def test_characters_external_api_failure(client):
         data = response.get_json()
         assert data["error"] == "API unavailable"
         assert data["status_code"] == 503
+
+
+# El resultado se cachea y la antiguedad se devuelve en X-Cache-Age. El
+# header Age no se usa: los caches HTTP lo restan del max-age
+def test_characters_cached(client):
+    mock_stats = {
+        "character_names": ["Rick"],
+        "human_count": 1,
+        "not_human_count": 0,
+        "dead_count": 0,
+        "alive_count": 1
+    }
+
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = mock_stats
+
+        first = client.get("/characters")
+        second = client.get("/characters")
+
+        # La API externa se consulta una sola vez
+        mock_stats_method.assert_called_once()
+
+    assert first.headers["X-Cache-Age"] == "0"
+    assert "X-Cache-Age" in second.headers
+    assert "Age" not in second.headers
+    assert second.get_json() == mock_stats
+
+
+# El endpoint devuelve un ETag y responde 304 si el cliente ya lo tiene
+def test_characters_etag_not_modified(client, monkeypatch):
+    monkeypatch.setenv("CACHE_CONTROL_MAX_AGE", "120")
+    mock_stats = {
+        "character_names": ["Rick"],
+        "human_count": 1,
+        "not_human_count": 0,
+        "dead_count": 0,
+        "alive_count": 1
+    }
+
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = mock_stats
+
+        first = client.get("/characters")
+        etag = first.headers["ETag"]
+
+        second = client.get("/characters", headers={"If-None-Match": etag})
+
+    # El ETag es fuerte (sin el prefijo W/)
+    assert not etag.startswith("W/")
+    assert "max-age=120" in first.headers["Cache-Control"]
+
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+
+
+# Un ETag que no coincide devuelve la respuesta completa
+def test_characters_etag_mismatch(client):
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = {
+            "character_names": [],
+            "human_count": 0,
+            "not_human_count": 0,
+            "dead_count": 0,
+            "alive_count": 0
+        }
+
+        response = client.get(
+            "/characters",
+            headers={"If-None-Match": '"outdated"'}
+            )
+
+    assert response.status_code == 200
+    assert response.get_json()["character_names"] == []
+
+
+# Con Accept NDJSON se envia una linea por pagina y una con los contadores
+def test_characters_ndjson_stream(client):
+    pages = [
+        {
+            "character_names": ["Rick", "Birdperson"],
+            "human_count": 1,
+            "not_human_count": 1,
+            "dead_count": 1,
+            "alive_count": 1
+        },
+        {
+            "character_names": ["Morty"],
+            "human_count": 1,
+            "not_human_count": 0,
+            "dead_count": 0,
+            "alive_count": 1
+        },
+    ]
+
+    with patch(PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = iter(pages)
+        response = client.get("/characters", headers=NDJSON_HEADERS)
+        lines = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert lines == [
+        {"character_names": ["Rick", "Birdperson"]},
+        {"character_names": ["Morty"]},
+        {
+            "human_count": 2,
+            "not_human_count": 1,
+            "dead_count": 1,
+            "alive_count": 2
+        },
+    ]
+
+
+# Si el agregado ya esta cacheado se envia sin consultar la API externa
+def test_characters_ndjson_from_cache(client):
+    mock_stats = {
+        "character_names": ["Rick"],
+        "human_count": 1,
+        "not_human_count": 0,
+        "dead_count": 0,
+        "alive_count": 1
+    }
+
+    with patch(STATS_METHOD) as mock_stats_method, \
+            patch(PAGES_METHOD) as mock_pages:
+        mock_stats_method.return_value = mock_stats
+        client.get("/characters")
+
+        response = client.get("/characters", headers=NDJSON_HEADERS)
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        mock_pages.assert_not_called()
+
+    assert lines[0] == {"character_names": ["Rick"]}
+    assert lines[1]["human_count"] == 1
+
+
+# Las dos representaciones dependen de Accept; el stream no se cachea
+def test_characters_vary_accept(client):
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = COMPRESSIBLE_STATS
+
+        response = client.get("/characters")
+        stream = client.get("/characters", headers=NDJSON_HEADERS)
+
+    assert "Accept" in response.vary
+    assert response.cache_control.public
+    assert "Accept" in stream.vary
+    assert stream.cache_control.no_store
+    assert "ETag" not in stream.headers
+
+
+# Un error en la primera pagina se responde con su status code
+def test_characters_ndjson_first_page_error(client):
+    with patch(PAGES_METHOD) as mock_pages:
+        mock_pages.side_effect = ExternalAPIError(
+            "API unavailable",
+            status_code=503
+            )
+        response = client.get("/characters", headers=NDJSON_HEADERS)
+
+    assert response.status_code == 503
+    assert response.get_json()["error"] == "API unavailable"
+
+
+# Un error despues de empezar a responder se envia como ultima linea
+def test_characters_ndjson_error_mid_stream(client):
+    def pages():
+        yield {"character_names": ["Rick"], "human_count": 1}
+        raise ExternalAPIError("Request timed out", status_code=504)
+
+    with patch(PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = pages()
+        response = client.get("/characters", headers=NDJSON_HEADERS)
+        lines = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.status_code == 200
+    assert lines == [
+        {"character_names": ["Rick"]},
+        {
+            "error": "Request timed out",
+            "source": "external_api",
+            "status_code": 504
+        },
+    ]
+
+
+# Se recorren los nombres con limit y cursor sin volver a pedir el agregado
+def test_characters_cursor_pagination(client):
+    mock_stats = {
+        "character_names": ["Rick", "Morty", "Summer", "Beth", "Jerry"],
+        "human_count": 5,
+        "not_human_count": 0,
+        "dead_count": 0,
+        "alive_count": 5
+    }
+
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = mock_stats
+
+        names = []
+        data = client.get("/characters?limit=2").get_json()
+        names += data["character_names"]
+        while data["next_cursor"]:
+            data = client.get(
+                f"/characters?limit=2&cursor={data['next_cursor']}"
+                ).get_json()
+            names += data["character_names"]
+
+            # Todas las porciones tienen los contadores completos
+            assert data["human_count"] == 5
+
+        mock_stats_method.assert_called_once()
+
+    assert names == mock_stats["character_names"]
+    assert data["next_cursor"] is None
+
+
+# El limit no puede superar CHARACTERS_MAX_LIMIT
+def test_characters_limit_capped(client, monkeypatch):
+    monkeypatch.setenv("CHARACTERS_MAX_LIMIT", "2")
+
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = {
+            "character_names": ["Rick", "Morty", "Summer"],
+            "human_count": 3,
+            "not_human_count": 0,
+            "dead_count": 0,
+            "alive_count": 3
+        }
+        data = client.get("/characters?limit=50").get_json()
+
+    assert data["character_names"] == ["Rick", "Morty"]
+    assert data["next_cursor"] is not None
+
+
+# Parametros invalidos devuelven 400
+@pytest.mark.parametrize("query", [
+    "limit=abc",
+    "limit=0",
+    "cursor=not-a-cursor",
+    "cursor=LTE=",
+])
+def test_characters_invalid_pagination(client, query):
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = {
+            "character_names": [],
+            "human_count": 0,
+            "not_human_count": 0,
+            "dead_count": 0,
+            "alive_count": 0
+        }
+        response = client.get(f"/characters?{query}")
+
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data["source"] == "request"
+    assert data["status_code"] == 400
+
+
+# region - Tests for /characters/stats
+
+STORE_CHARACTERS = [
+    {"name": "Rick", "species": "Human", "status": "Alive"},
+    {"name": "Morty", "species": "Human", "status": "Alive"},
+    {"name": "Birdperson", "species": "Alien", "status": "Dead"},
+]
+
+
+# Cantidad de personajes por cada combinacion de los campos pedidos
+def test_characters_stats_group_by(client):
+    with patch(STORE_METHOD) as mock_store_method:
+        mock_store_method.return_value = CharacterStore.from_characters(
+            STORE_CHARACTERS
+            )
+        response = client.get("/characters/stats?group_by=species,status")
+
+    assert response.status_code == 200
+    assert "ETag" in response.headers
+    assert response.get_json() == {
+        "group_by": ["species", "status"],
+        "total": 3,
+        "groups": [
+            {"species": "Human", "status": "Alive", "count": 2},
+            {"species": "Alien", "status": "Dead", "count": 1},
+        ]
+    }
+
+
+# group_by faltante, con campos desconocidos o repetidos devuelve 400
+@pytest.mark.parametrize("query", [
+    "",
+    "group_by=",
+    "group_by=name",
+    "group_by=species,species",
+])
+def test_characters_stats_invalid_group_by(client, query):
+    with patch(STORE_METHOD) as mock_store_method:
+        mock_store_method.return_value = CharacterStore()
+        response = client.get(f"/characters/stats?{query}")
+
+    assert response.status_code == 400
+    assert response.get_json()["source"] == "request"
+
+# endregion
+
+
+# region - Tests for compressed responses
+
+COMPRESSIBLE_STATS = {
+    "character_names": [f"Character {i}" for i in range(500)],
+    "human_count": 500,
+    "not_human_count": 0,
+    "dead_count": 0,
+    "alive_count": 500
+}
+
+
+# El cuerpo se comprime segun Accept-Encoding, con un ETag por codificacion
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1, br;q=0.5", "gzip"),
+])
+def test_characters_compressed(client, accept_encoding, encoding):
+    if encoding == "br":
+        decompress = pytest.importorskip("brotli").decompress
+    else:
+        decompress = gzip.decompress
+
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = COMPRESSIBLE_STATS
+
+        plain = client.get("/characters")
+        response = client.get(
+            "/characters",
+            headers={"Accept-Encoding": accept_encoding}
+            )
+
+    assert plain.headers.get("Content-Encoding") is None
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert decompress(response.data) == plain.data
+    assert response.headers["ETag"] != plain.headers["ETag"]
+
+
+# Un If-None-Match con el ETag de la version comprimida devuelve 304
+def test_characters_compressed_not_modified(client):
+    headers = {"Accept-Encoding": "gzip"}
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = COMPRESSIBLE_STATS
+
+        first = client.get("/characters", headers=headers)
+        second = client.get("/characters", headers={
+            **headers,
+            "If-None-Match": first.headers["ETag"]
+            })
+
+    assert second.status_code == 304
+
+
+# Los cuerpos chicos no se comprimen
+def test_characters_small_body_not_compressed(client):
+    with patch(STATS_METHOD) as mock_stats_method:
+        mock_stats_method.return_value = {
+            "character_names": ["Rick"],
+            "human_count": 1,
+            "not_human_count": 0,
+            "dead_count": 0,
+            "alive_count": 1
+        }
+        response = client.get(
+            "/characters",
+            headers={"Accept-Encoding": "gzip"}
+            )
+
+    assert response.headers.get("Content-Encoding") is None
+
+
+# Mientras el agregado cacheado no cambia el cuerpo no se vuelve a serializar
+def test_characters_body_serialized_once(client):
+    with patch(STATS_METHOD) as mock_stats_method, \
+            patch(
+                "app.http_cache._json_bytes",
+                side_effect=lambda result: json.dumps(result).encode()
+                ) as mock_json_bytes:
+        mock_stats_method.return_value = COMPRESSIBLE_STATS
+
+        client.get("/characters")
+        client.get("/characters", headers={"Accept-Encoding": "gzip"})
+        client.get("/characters?limit=10")
+        # Los query params que la ruta no lee (cache-buster) no crean otra
+        # entrada
+        client.get("/characters?_=1")
+        client.get("/characters?limit=10&_=2")
+
+    # Una vez para /characters y otra para la porcion con limit
+    assert mock_json_bytes.call_count == 2
+
+# endregion
+
+
+# region - Tests for /characters/export
+
+EXPORT_PAGES = [
+    {"results": [
+        {"id": 1, "name": "Rick Sanchez", "species": "Human",
+         "status": "Alive", "gender": "Male",
+         "origin": {"name": "Earth (C-137)", "url": ""},
+         "location": {"name": "Citadel of Ricks", "url": ""},
+         "episode": ["S01E01"]},
+        {"id": 2, "name": "Birdperson, Phoenixperson", "species": None,
+         "status": True, "origin": "unknown"},
+    ]},
+    {"results": []},
+    {"results": [
+        {"id": 3, "name": "Summer", "species": "Human", "status": "Alive",
+         "gender": "Female", "origin": {"name": "Earth \"C-137\""},
+         "location": {"name": "Earth"}},
+    ]},
+]
+
+
+# El CSV tiene una cabecera y una fila por personaje, en orden
+def test_characters_export_csv(client):
+    with patch(ALL_PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = iter(EXPORT_PAGES)
+        response = client.get("/characters/export?format=csv")
+        body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == (
+        "attachment; filename=characters.csv"
+        )
+    assert list(csv.reader(io.StringIO(body))) == [
+        ["id", "name", "species", "status", "gender", "origin", "location"],
+        ["1", "Rick Sanchez", "Human", "Alive", "Male", "Earth (C-137)",
+         "Citadel of Ricks"],
+        ["2", "Birdperson, Phoenixperson", "", "", "", "", ""],
+        ["3", "Summer", "Human", "Alive", "Female", 'Earth "C-137"', "Earth"],
+    ]
+    mock_pages.assert_called_once_with("character")
+
+
+# El formato por defecto es CSV
+def test_characters_export_default_format(client):
+    with patch(ALL_PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = iter([{"results": []}])
+        response = client.get("/characters/export")
+        body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/csv"
+    assert body == "id,name,species,status,gender,origin,location\r\n"
+
+
+# En NDJSON se envia un objeto por personaje
+def test_characters_export_ndjson(client):
+    with patch(ALL_PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = iter(EXPORT_PAGES)
+        response = client.get("/characters/export?format=ndjson")
+        lines = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.mimetype == "application/x-ndjson"
+    assert [line["id"] for line in lines] == [1, 2, 3]
+    assert lines[0] == {
+        "id": 1,
+        "name": "Rick Sanchez",
+        "species": "Human",
+        "status": "Alive",
+        "gender": "Male",
+        "origin": "Earth (C-137)",
+        "location": "Citadel of Ricks",
+    }
+    assert lines[1]["status"] is None
+
+
+# Las paginas se piden a medida que se envia la respuesta
+def test_characters_export_streams_pages(client):
+    fetched = []
+
+    def pages():
+        for page in EXPORT_PAGES:
+            fetched.append(page)
+            yield page
+
+    with patch(ALL_PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = pages()
+        response = client.get("/characters/export?format=ndjson")
+        chunks = iter(response.response)
+
+        # Antes de empezar a responder solo se pidio la primera pagina
+        assert len(fetched) == 1
+        next(chunks)
+        assert len(fetched) == 1
+        list(chunks)
+        assert len(fetched) == 3
+
+
+def test_characters_export_invalid_format(client):
+    response = client.get("/characters/export?format=xml")
+
+    assert response.status_code == 400
+    assert "Invalid format" in response.get_json()["error"]
+
+
+# Un error en la primera pagina se responde con su status code
+def test_characters_export_first_page_error(client):
+    with patch(ALL_PAGES_METHOD) as mock_pages:
+        mock_pages.return_value.__next__.side_effect = ExternalAPIError(
+            "API unavailable",
+            status_code=503
+            )
+        response = client.get("/characters/export?format=csv")
+
+    assert response.status_code == 503
+
+
+# Un error despues de empezar a responder se envia como ultima linea
+def test_characters_export_ndjson_error_mid_stream(client):
+    def pages():
+        yield EXPORT_PAGES[0]
+        raise ExternalAPIError("Request timed out", status_code=504)
+
+    with patch(ALL_PAGES_METHOD) as mock_pages:
+        mock_pages.return_value = pages()
+        response = client.get("/characters/export?format=ndjson")
+        lines = [json.loads(line) for line in response.data.splitlines()]
+
+    assert [line.get("id") for line in lines[:2]] == [1, 2]
+    assert lines[2] == {
+        "error": "Request timed out",
+        "source": "external_api",
+        "status_code": 504
+    }
+
+# endregion
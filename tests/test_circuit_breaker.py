@@ -0,0 +1,177 @@
+import pytest
+from unittest.mock import patch
+from requests.exceptions import Timeout
+from app.services.circuit_breaker import CircuitBreaker, OPEN, CLOSED
+from app.services.retry_budget import RetryBudget
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from app.exceptions.external_api import ExternalAPIError
+from conftest import MockResponse
+
+
+def make_breaker(**kwargs):
+    options = {
+        "consecutive_timeouts": 3,
+        "error_rate": 0.5,
+        "window_size": 4,
+        "reset_timeout": 30,
+        "half_open_max_calls": 1,
+    }
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+# region - Tests for CircuitBreaker
+
+# Se abre con timeouts seguidos y falla rapido con un 503
+def test_breaker_opens_on_consecutive_timeouts():
+    breaker = make_breaker()
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure(timeout=True)
+
+    assert breaker.state == OPEN
+    with pytest.raises(ExternalAPIError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.status_code == 503
+
+
+# Un request correcto reinicia la cuenta de timeouts seguidos
+def test_breaker_success_resets_timeouts():
+    breaker = make_breaker(window_size=100)
+
+    for _ in range(2):
+        breaker.record_failure(timeout=True)
+    breaker.record_success()
+    breaker.record_failure(timeout=True)
+
+    assert breaker.state == CLOSED
+
+
+# Se abre cuando la proporcion de errores de la ventana supera el limite
+def test_breaker_opens_on_error_rate():
+    breaker = make_breaker()
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+# Pasado reset_timeout deja pasar un request de prueba
+@patch("app.services.circuit_breaker.time.monotonic")
+def test_breaker_half_open_probe(mock_monotonic):
+    mock_monotonic.return_value = 0
+    breaker = make_breaker(consecutive_timeouts=1)
+    breaker.record_failure(timeout=True)
+
+    mock_monotonic.return_value = 31
+    breaker.before_call()
+
+    # Mientras la prueba esta en curso los demas requests fallan
+    with pytest.raises(ExternalAPIError):
+        breaker.before_call()
+
+    # Si la prueba funciona se cierra
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+# Si la prueba falla se vuelve a abrir
+@patch("app.services.circuit_breaker.time.monotonic")
+def test_breaker_half_open_failure_reopens(mock_monotonic):
+    mock_monotonic.return_value = 0
+    breaker = make_breaker(consecutive_timeouts=1)
+    breaker.record_failure(timeout=True)
+
+    mock_monotonic.return_value = 31
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(ExternalAPIError):
+        breaker.before_call()
+
+# endregion
+
+
+# region - Tests for RetryBudget
+
+# Los reintentos estan limitados por request y por presupuesto
+def test_retry_budget_limits():
+    budget = RetryBudget(ratio=0.5, max_tokens=2, max_retries=5)
+
+    assert budget.can_retry(1)
+    assert budget.can_retry(2)
+    # Presupuesto agotado
+    assert not budget.can_retry(3)
+
+    # Dos requests recargan un reintento
+    budget.deposit()
+    budget.deposit()
+    assert budget.can_retry(1)
+
+    # Nunca mas de max_retries por request
+    assert not RetryBudget(max_retries=1).can_retry(2)
+
+
+# La espera crece exponencialmente con un maximo
+def test_retry_budget_delay():
+    budget = RetryBudget(base_delay=0.1, max_delay=0.3)
+
+    assert 0 <= budget.delay(1) <= 0.1
+    assert 0 <= budget.delay(5) <= 0.3
+
+# endregion
+
+
+# region - Tests for RickAndMortyAPI with retries
+
+# Un timeout se reintenta y el segundo intento funciona
+@patch("app.services.rick_and_morty_api.time.sleep")
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_api_retries_timeout(mock_get, mock_sleep):
+    mock_get.side_effect = [Timeout("timeout"), MockResponse({"ok": True})]
+
+    assert RickAndMortyAPI()._get("http://fakeurl.com") == {"ok": True}
+    assert mock_get.call_count == 2
+    mock_sleep.assert_called_once()
+
+
+# Los errores del request (4xx) no se reintentan
+@patch("app.services.rick_and_morty_api.time.sleep")
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_api_does_not_retry_client_errors(mock_get, mock_sleep):
+    mock_get.return_value = MockResponse({}, status_code=404, raise_http=True)
+
+    with pytest.raises(ExternalAPIError) as exc_info:
+        RickAndMortyAPI()._get("http://fakeurl.com")
+
+    assert exc_info.value.status_code == 404
+    assert mock_get.call_count == 1
+
+
+# Con el circuito abierto no se hacen requests a la API externa
+@patch("app.services.rick_and_morty_api.time.sleep")
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_api_fails_fast_when_open(mock_get, mock_sleep):
+    mock_get.side_effect = Timeout("timeout")
+    api = RickAndMortyAPI()
+    api.circuit_breaker = make_breaker(consecutive_timeouts=3)
+
+    # 1 intento + 2 reintentos abren el circuito
+    with pytest.raises(ExternalAPIError) as exc_info:
+        api._get("http://fakeurl.com")
+    assert exc_info.value.status_code == 504
+    assert mock_get.call_count == 3
+
+    with pytest.raises(ExternalAPIError) as exc_info:
+        api._get("http://fakeurl.com")
+    assert exc_info.value.status_code == 503
+    assert mock_get.call_count == 3
+
+# endregion
@@ -0,0 +1,36 @@
+import requests
+from flask import Flask
+from app import create_app
+from app.extensions import get_rick_and_morty_api, RICK_AND_MORTY_API
+
+
+# create_app crea un unico cliente con sesion HTTP compartida
+def test_create_app_shares_client():
+    app = create_app()
+
+    with app.app_context():
+        first = get_rick_and_morty_api()
+        second = get_rick_and_morty_api()
+
+    assert first is second
+    assert first is app.extensions[RICK_AND_MORTY_API]
+    assert isinstance(first.session, requests.Session)
+
+
+# Una app sin el cliente inicializado lo crea la primera vez que se pide
+def test_client_created_lazily():
+    app = Flask(__name__)
+
+    with app.app_context():
+        external_api = get_rick_and_morty_api()
+
+    assert app.extensions[RICK_AND_MORTY_API] is external_api
+
+
+# El tamaño del pool por host se configura por variable de entorno
+def test_pool_size_from_env(monkeypatch):
+    monkeypatch.setenv("RICK_AND_MORTY_POOL_SIZE", "3")
+    app = create_app()
+
+    session = app.extensions[RICK_AND_MORTY_API].session
+    assert session.get_adapter("https://example.com")._pool_maxsize == 3
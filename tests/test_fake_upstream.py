@@ -0,0 +1,97 @@
+import pytest
+import requests
+from unittest.mock import patch
+from benchmarks.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from benchmarks.load_test import percentile, summarize
+from app.exceptions.external_api import ExternalAPIError
+from app.services.rick_and_morty_api import RickAndMortyAPI
+
+
+@pytest.fixture
+def upstream():
+    with FakeUpstream(FakeUpstreamConfig(characters=45, page_size=10)) as fake:
+        yield fake
+
+
+# Cliente de la app apuntando al servidor falso
+def make_api(upstream):
+    with patch.dict("os.environ", {
+        "RICK_AND_MORTY_BASE_URL": upstream.base_url
+    }):
+        return RickAndMortyAPI()
+
+
+# region servidor falso
+
+# El agregado de personajes contra el servidor falso es el de todo el dataset
+def test_characters_stats_match_dataset(upstream):
+    api = make_api(upstream)
+
+    assert api.get_all_characters_stats() == (
+        RickAndMortyAPI.extract_character_stats(upstream.characters)
+        )
+
+
+# Sin paralelismo se recorren las paginas con los links "next"
+def test_characters_pages_follow_next_links(upstream):
+    api = make_api(upstream)
+    api.max_workers = 1
+
+    pages = list(api.iter_all_pages("character"))
+
+    assert len(pages) == 5
+    assert pages[-1]["info"]["next"] is None
+
+
+# Las locaciones se filtran por nombre y tipo sin distinguir mayusculas
+def test_location_filter(upstream):
+    api = make_api(upstream)
+
+    location = api.get_location_by_name_and_type("earth", "planet")
+    assert (location["name"], location["type"]) == ("Earth (C-137)", "Planet")
+
+    with pytest.raises(ExternalAPIError) as error:
+        api.get_location_by_name_and_type("nowhere", "planet")
+    assert error.value.status_code == 404
+
+
+# Una lista de ids devuelve una lista de personajes
+def test_characters_by_id(upstream):
+    response = requests.get(f"{upstream.base_url}/character/1,3,99")
+
+    assert [character["id"] for character in response.json()] == [1, 3]
+
+
+# Con error_rate 1 todos los requests fallan con error_status
+def test_error_injection():
+    config = FakeUpstreamConfig(error_rate=1, error_status=503)
+    with FakeUpstream(config) as upstream:
+        response = requests.get(f"{upstream.base_url}/character")
+
+    assert response.status_code == 503
+
+# endregion
+
+
+# region resultados del load test
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([0.5], 95) == 0.5
+    assert percentile([], 50) is None
+
+
+def test_summarize():
+    samples = {"/characters": [(0.1, 200), (0.3, 200), (0.2, 502)]}
+
+    summary = summarize(samples, 2)
+
+    assert summary["/characters"]["requests"] == 3
+    assert summary["/characters"]["throughput_rps"] == 1.5
+    assert summary["/characters"]["p50_s"] == 0.2
+    assert summary["/characters"]["status_codes"] == {"200": 2, "502": 1}
+
+# endregion
@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import patch
+from app import create_app
+from app.extensions import WARM_UP
+
+STATS_METHOD = (
+    "app.services.character_sync.CharacterStatsSync.get_all_characters_stats"
+    )
+STORE_METHOD = (
+    "app.services.character_sync.CharacterStatsSync.get_character_store"
+    )
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.testing = True
+    return app.test_client()
+
+
+def test_healthz(client):
+    response = client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+# Sin WARMUP la app esta lista desde el principio
+def test_readyz_without_warm_up(client):
+    response = client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ready"}
+
+
+# Con WARMUP=1 /readyz responde 503 hasta que termina el warm-up
+@patch(STORE_METHOD)
+@patch(STATS_METHOD)
+def test_readyz_with_warm_up(mock_stats, mock_store, monkeypatch):
+    monkeypatch.setenv("WARMUP", "1")
+    monkeypatch.setenv("WARMUP_RETRY_INTERVAL", "60")
+    mock_stats.side_effect = [RuntimeError("upstream down"), {}]
+
+    app = create_app()
+    warm_up = app.extensions[WARM_UP]
+    for _ in range(100):
+        if warm_up.error is not None:
+            break
+        warm_up.wait(0.01)
+    client = app.test_client()
+
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json() == {
+        "status": "warming_up",
+        "error": "upstream down"
+        }
+
+    # Detengo el thread que espera para reintentar y vuelvo a empezar: el
+    # siguiente intento carga los caches de /characters y /characters/stats
+    warm_up.stop()
+    warm_up._thread.join(1)
+    warm_up.start()
+    assert warm_up.wait(1)
+
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert mock_stats.call_count == 2
+    mock_store.assert_called_once_with()
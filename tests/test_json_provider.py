@@ -0,0 +1,64 @@
+import datetime
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.json_provider import FastJSONProvider, dumps, loads
+
+PAYLOADS = [
+    {
+        "character_names": ["Rick", "Morty", "Summer"],
+        "human_count": 3,
+        "not_human_count": 0,
+        "dead_count": 0,
+        "alive_count": 3
+    },
+    # Caracteres no ASCII y de control
+    {"name": "Señor Poopybutthole ☃", "type": "Tab\there \"quoted\""},
+    {"date": datetime.datetime(2020, 1, 1, 12, 30)},
+    [],
+    None,
+]
+
+
+# Respuesta de una app con el provider indicado
+def response_bytes(provider_class, payload):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        return app.json.response(payload).get_data()
+
+
+# Las respuestas son identicas byte a byte a las de DefaultJSONProvider
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_response_matches_default_provider(payload):
+    assert response_bytes(FastJSONProvider, payload) == response_bytes(
+        DefaultJSONProvider,
+        payload
+        )
+
+
+# Sin orjson se usa la libreria estandar con el mismo resultado
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_response_without_orjson(payload):
+    with patch("app.json_provider.orjson", None):
+        fast = response_bytes(FastJSONProvider, payload)
+
+    assert fast == response_bytes(DefaultJSONProvider, payload)
+
+
+# dumps devuelve bytes compactos y loads los vuelve a decodificar
+def test_dumps_loads_round_trip():
+    data = {"b": [1, 2], "a": "Señor"}
+
+    encoded = dumps(data)
+
+    assert encoded == b'{"a":"Se\\u00f1or","b":[1,2]}'
+    assert loads(encoded) == data
+    assert loads(encoded.decode()) == data
+
+
+# JSON invalido lanza ValueError, igual que json.loads
+def test_loads_invalid_json():
+    with pytest.raises(ValueError):
+        loads(b"not-a-json")
@@ -5,6 +5,12 @@ from app.routes.location import location_bp
 from app.exceptions.external_api import ExternalAPIError
 from app.error_handlers import register_error_handlers
 
+# Metodo del service que se mockea en los tests
+LOCATION_METHOD = (
+    "app.services.rick_and_morty_api.RickAndMortyAPI."
+    "get_location_by_name_and_type"
+    )
+
 
 # creo el cliente sobre el que se ejecutaran las pruebas
 @pytest.fixture
@@ -27,9 +33,7 @@ def test_location_success(client):
         "dimension": "Dimension C-137",
     }
 
-    with patch(
-            "app.routes.location.RickAndMortyAPI.get_location_by_name_and_type"
-            ) as mock_get_location:
+    with patch(LOCATION_METHOD) as mock_get_location:
 
         mock_get_location.return_value = mock_location
 
@@ -48,9 +52,7 @@ def test_location_success(client):
 
 # Busqueda no encontrada. (Servicio externo no devuelve la clave "results")
 def test_location_not_found(client):
-    with patch(
-            "app.routes.location.RickAndMortyAPI.get_location_by_name_and_type"
-            ) as mock_get_location:
+    with patch(LOCATION_METHOD) as mock_get_location:
 
         mock_get_location.side_effect = ExternalAPIError(
             "No matching location found",
@@ -75,9 +77,7 @@ def test_location_without_parameters(client):
         "type": "Space station"
     }
 
-    with patch(
-            "app.routes.location.RickAndMortyAPI.get_location_by_name_and_type"
-            ) as mock_get_location:
+    with patch(LOCATION_METHOD) as mock_get_location:
 
         mock_get_location.return_value = mock_location
 
@@ -89,3 +89,161 @@ def test_location_without_parameters(client):
         data = response.get_json()
         assert data["name"] == "Citadel of Ricks"
         assert data["type"] == "Space station"
+
+
+# El ETag depende del contenido de la respuesta
+def test_location_etag(client):
+    with patch(LOCATION_METHOD) as mock_get_location:
+        mock_get_location.return_value = {"name": "Earth", "type": "Planet"}
+        earth = client.get("/location?name=earth")
+        cached = client.get(
+            "/location?name=earth",
+            headers={"If-None-Match": earth.headers["ETag"]}
+            )
+
+        mock_get_location.return_value = {"name": "Mars", "type": "Planet"}
+        mars = client.get("/location?name=mars")
+
+    assert cached.status_code == 304
+    assert earth.headers["ETag"] != mars.headers["ETag"]
+    # Solo /characters depende de Accept
+    assert earth.vary.as_set() == {"accept-encoding"}
+
+
+# Las busquedas repetidas (sin distinguir mayusculas) y los 404 repetidos
+# se responden desde el cache sin volver a consultar la API externa
+def test_location_lookup_cache(client):
+    with patch(LOCATION_METHOD) as mock_get_location:
+        mock_get_location.return_value = {"name": "Earth", "type": "Planet"}
+        first = client.get("/location?name=earth")
+        second = client.get("/location?name=EARTH")
+
+        mock_get_location.side_effect = ExternalAPIError(
+            "No matching location found",
+            status_code=404
+            )
+        missing = [client.get("/location?name=eatrh") for _ in range(3)]
+
+    assert first.get_json() == second.get_json()
+    assert [response.status_code for response in missing] == [404] * 3
+    assert mock_get_location.call_count == 2
+
+
+# region - Tests for /locations/batch
+
+# Locaciones falsas: encuentra earth y citadel, el resto es un 404
+def fake_location(name=None, type_=None):
+    if name == "earth":
+        return {"name": "Earth (C-137)", "type": "Planet", "dimension": "C"}
+    if name == "citadel":
+        return {"name": "Citadel of Ricks", "type": "Space station"}
+    if name == "slow":
+        raise ExternalAPIError("Request timed out", status_code=504)
+    raise ExternalAPIError("No matching location found", status_code=404)
+
+
+# Los resultados vuelven en el orden de las consultas, con el error de cada
+# consulta que fallo, y las consultas repetidas se resuelven una vez
+def test_locations_batch(client):
+    queries = [
+        {"name": "earth", "type": "planet"},
+        {"name": "nowhere"},
+        {"name": "citadel"},
+        {"name": "earth", "type": "planet"},
+        {"name": "slow"},
+    ]
+
+    with patch(LOCATION_METHOD) as mock_get_location:
+        mock_get_location.side_effect = fake_location
+        response = client.post("/locations/batch", json={"queries": queries})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"results": [
+        {
+            "query": {"name": "earth", "type": "planet"},
+            "location": {"name": "Earth (C-137)", "type": "Planet"}
+        },
+        {
+            "query": {"name": "nowhere", "type": None},
+            "error": {
+                "error": "No matching location found",
+                "source": "external_api",
+                "status_code": 404
+            }
+        },
+        {
+            "query": {"name": "citadel", "type": None},
+            "location": {"name": "Citadel of Ricks", "type": "Space station"}
+        },
+        {
+            "query": {"name": "earth", "type": "planet"},
+            "location": {"name": "Earth (C-137)", "type": "Planet"}
+        },
+        {
+            "query": {"name": "slow", "type": None},
+            "error": {
+                "error": "Request timed out",
+                "source": "external_api",
+                "status_code": 504
+            }
+        },
+    ]}
+    assert mock_get_location.call_count == 4
+
+
+# Un filtro vacio es lo mismo que no filtrar
+def test_locations_batch_empty_filters(client):
+    queries = [{"name": "earth", "type": ""}, {"name": "earth"}]
+
+    with patch(LOCATION_METHOD) as mock_get_location:
+        mock_get_location.side_effect = fake_location
+        response = client.post("/locations/batch", json={"queries": queries})
+
+    results = response.get_json()["results"]
+    assert [result["query"] for result in results] == [
+        {"name": "earth", "type": ""},
+        {"name": "earth", "type": None},
+    ]
+    mock_get_location.assert_called_once_with(name="earth", type_=None)
+
+
+def test_locations_batch_empty_list(client):
+    response = client.post("/locations/batch", json={"queries": []})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"results": []}
+
+
+# Un body invalido responde 400
+@pytest.mark.parametrize("body", [
+    None,
+    [],
+    {"queries": "earth"},
+    {"queries": ["earth"]},
+    {"queries": [{"name": 1}]},
+    {"queries": [{"type": ["planet"]}]},
+])
+def test_locations_batch_invalid_body(client, body):
+    with patch(LOCATION_METHOD) as mock_get_location:
+        if body is None:
+            response = client.post("/locations/batch", data="not json")
+        else:
+            response = client.post("/locations/batch", json=body)
+
+    assert response.status_code == 400
+    assert response.get_json()["source"] == "request"
+    mock_get_location.assert_not_called()
+
+
+def test_locations_batch_too_many_queries(client, monkeypatch):
+    monkeypatch.setenv("LOCATIONS_BATCH_MAX_SIZE", "2")
+
+    response = client.post(
+        "/locations/batch",
+        json={"queries": [{"name": "earth"}] * 3}
+        )
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "At most 2 queries are allowed"
+
+# endregion
@@ -0,0 +1,141 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from app.exceptions.external_api import ExternalAPIError
+from app.services.location_cache import LocationLookupCache
+
+EARTH = {"name": "Earth (C-137)", "type": "Planet"}
+
+
+# Fuente falsa: encuentra "earth" y responde 404 a lo demas
+@pytest.fixture
+def source():
+    def get_location_by_name_and_type(name=None, type_=None):
+        if name and "earth" in name.lower():
+            return EARTH
+        raise ExternalAPIError(
+            "HTTP error: 404 Client Error: Not Found for url: "
+            "https://rickandmortyapi.com/api/location?name=eatrh",
+            status_code=404
+            )
+
+    source = MagicMock()
+    source.get_location_by_name_and_type.side_effect = (
+        get_location_by_name_and_type
+        )
+    return source
+
+
+@pytest.fixture
+def cache(source):
+    return LocationLookupCache(source, max_entries=2, ttl=60, miss_ttl=10)
+
+
+# region - Tests for LocationLookupCache
+
+# Las busquedas se guardan por nombre y tipo normalizados
+def test_cache_hits(cache, source):
+    assert cache.get_location_by_name_and_type("earth", "planet") == EARTH
+    assert cache.get_location_by_name_and_type("Earth", "PLANET") == EARTH
+
+    source.get_location_by_name_and_type.assert_called_once_with(
+        name="earth",
+        type_="planet"
+        )
+    assert cache.stats() == {
+        "hits": 1,
+        "negative_hits": 0,
+        "misses": 1,
+        "evictions": 0,
+        "size": 1,
+    }
+
+
+# Un filtro vacio es lo mismo que no filtrar
+def test_cache_empty_filter(cache, source):
+    cache.get_location_by_name_and_type("earth", None)
+    cache.get_location_by_name_and_type("earth", "")
+
+    assert source.get_location_by_name_and_type.call_count == 1
+
+
+# Los 404 tambien se guardan y se vuelven a levantar con el mismo mensaje
+# que el de la API externa
+def test_cache_negative_hits(cache, source):
+    messages = set()
+    for _ in range(3):
+        with pytest.raises(ExternalAPIError) as exc_info:
+            cache.get_location_by_name_and_type("eatrh")
+        assert exc_info.value.status_code == 404
+        messages.add(exc_info.value.message)
+
+    assert messages == {
+        "HTTP error: 404 Client Error: Not Found for url: "
+        "https://rickandmortyapi.com/api/location?name=eatrh"
+        }
+
+    assert source.get_location_by_name_and_type.call_count == 1
+    assert cache.stats()["negative_hits"] == 2
+
+
+# Los demas errores no se guardan
+def test_cache_skips_other_errors(cache, source):
+    source.get_location_by_name_and_type.side_effect = ExternalAPIError(
+        "Request timed out",
+        status_code=504
+        )
+
+    for _ in range(2):
+        with pytest.raises(ExternalAPIError):
+            cache.get_location_by_name_and_type("earth")
+
+    assert source.get_location_by_name_and_type.call_count == 2
+    assert cache.stats()["size"] == 0
+
+
+# Los 404 vencen antes que las busquedas encontradas
+@patch("app.services.location_cache.time.monotonic")
+def test_cache_ttls(mock_monotonic, cache, source):
+    mock_monotonic.return_value = 0
+    cache.get_location_by_name_and_type("earth")
+    with pytest.raises(ExternalAPIError):
+        cache.get_location_by_name_and_type("eatrh")
+
+    # Paso el TTL de los 404 pero no el de las busquedas encontradas
+    mock_monotonic.return_value = 20
+    cache.get_location_by_name_and_type("earth")
+    with pytest.raises(ExternalAPIError):
+        cache.get_location_by_name_and_type("eatrh")
+    assert source.get_location_by_name_and_type.call_count == 3
+
+    mock_monotonic.return_value = 100
+    cache.get_location_by_name_and_type("earth")
+    assert source.get_location_by_name_and_type.call_count == 4
+
+
+# Con el cache lleno se descarta la busqueda usada hace mas tiempo
+def test_cache_lru_eviction(cache, source):
+    cache.get_location_by_name_and_type("earth")
+    cache.get_location_by_name_and_type("earth (c-137)")
+    # "earth" pasa a ser la mas reciente
+    cache.get_location_by_name_and_type("earth")
+    with pytest.raises(ExternalAPIError):
+        cache.get_location_by_name_and_type("mars")
+
+    cache.get_location_by_name_and_type("earth")
+    cache.get_location_by_name_and_type("earth (c-137)")
+
+    assert source.get_location_by_name_and_type.call_count == 4
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["size"] == 2
+
+
+# Con tamaño 0 el cache no guarda nada
+def test_cache_disabled(source):
+    cache = LocationLookupCache(source, max_entries=0, ttl=60, miss_ttl=10)
+
+    cache.get_location_by_name_and_type("earth")
+    cache.get_location_by_name_and_type("earth")
+
+    assert source.get_location_by_name_and_type.call_count == 2
+
+# endregion
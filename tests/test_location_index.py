@@ -0,0 +1,128 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.services.location_index import LocationIndex
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from app.exceptions.external_api import ExternalAPIError
+
+LOCATIONS = [
+    {"id": 1, "name": "Earth (C-137)", "type": "Planet"},
+    {"id": 2, "name": "Abadango", "type": "Cluster"},
+    {"id": 3, "name": "Earth (Replacement Dimension)", "type": "Planet"},
+    {"id": 4, "name": "Citadel of Ricks", "type": "Space station"},
+]
+
+
+# Cliente de la API externa falso que devuelve LOCATIONS en dos paginas
+@pytest.fixture
+def external_api():
+    external_api = MagicMock()
+    external_api.iter_all_pages.side_effect = lambda resource: iter([
+        {"results": LOCATIONS[:2]},
+        {"results": LOCATIONS[2:]},
+    ])
+    external_api.first_location = RickAndMortyAPI.first_location
+    return external_api
+
+
+@pytest.fixture
+def location_index(external_api):
+    location_index = LocationIndex(external_api, refresh_interval=60)
+    location_index.load()
+    return location_index
+
+
+# Con el indice sin cargar se consulta la API externa
+def test_cold_index_falls_back_to_api(external_api):
+    external_api.get_location_by_name_and_type.return_value = LOCATIONS[1]
+    location_index = LocationIndex(external_api)
+
+    result = location_index.get_location_by_name_and_type(name="aba")
+
+    assert result == LOCATIONS[1]
+    external_api.get_location_by_name_and_type.assert_called_once_with(
+        name="aba",
+        type_=None
+        )
+
+
+# Busqueda parcial sin distinguir mayusculas, primer resultado en orden
+@pytest.mark.parametrize("name, type_, expected", [
+    ("earth", "planet", "Earth (C-137)"),
+    ("EARTH (rep", None, "Earth (Replacement Dimension)"),
+    (None, "station", "Citadel of Ricks"),
+    ("", "", "Earth (C-137)"),
+])
+def test_index_partial_match(location_index, name, type_, expected):
+    result = location_index.get_location_by_name_and_type(
+        name=name,
+        type_=type_
+        )
+
+    assert result["name"] == expected
+
+
+# Sin resultados devuelve el mismo 404 que la API externa
+def test_index_not_found(location_index):
+    with pytest.raises(ExternalAPIError) as exc_info:
+        location_index.get_location_by_name_and_type(name="earth", type_="x")
+
+    assert "No matching location found" in str(exc_info.value)
+    assert exc_info.value.status_code == 404
+
+
+# Una locacion sin name o type da el mismo 502 que la API externa
+def test_index_invalid_location(external_api):
+    external_api.iter_all_pages.side_effect = lambda resource: iter([
+        {"results": [{"name": "Nowhere"}]},
+    ])
+    location_index = LocationIndex(external_api)
+    location_index.load()
+
+    with pytest.raises(ExternalAPIError) as exc_info:
+        location_index.get_location_by_name_and_type(name="nowhere")
+
+    assert exc_info.value.status_code == 502
+
+
+# Las busquedas repetidas se resuelven desde el diccionario de consultas
+def test_index_caches_queries(location_index):
+    location_index.get_location_by_name_and_type(name="Abadango")
+    assert ("abadango", "") in location_index._queries
+
+    # Si se recarga el indice se descartan las consultas guardadas
+    location_index.load()
+    assert location_index._queries == {}
+
+
+# start carga el indice en segundo plano
+def test_index_background_load(external_api):
+    location_index = LocationIndex(external_api, refresh_interval=60)
+    location_index.start()
+
+    for _ in range(100):
+        if location_index.is_ready():
+            break
+        time.sleep(0.01)
+    location_index.stop()
+
+    assert location_index.is_ready()
+    assert location_index.get_location_by_name_and_type(
+        name="citadel"
+        )["type"] == "Space station"
+
+
+# Si el indice ya se cargo (por el warm-up) start no lo vuelve a cargar
+# hasta el proximo refresh
+def test_index_start_after_load(location_index, external_api):
+    external_api.iter_all_pages.reset_mock()
+
+    location_index.start()
+    time.sleep(0.05)
+    location_index.stop()
+
+    assert location_index._thread is not None
+    external_api.iter_all_pages.assert_not_called()
+    assert location_index.get_location_by_name_and_type(
+        name="abadango"
+        )["id"] == 2
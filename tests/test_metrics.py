@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch
+from requests.exceptions import Timeout
+from app import create_app
+from app.metrics import upstream_endpoint
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from app.exceptions.external_api import ExternalAPIError
+from conftest import MockResponse
+
+LOCATION_METHOD = (
+    "app.services.rick_and_morty_api.RickAndMortyAPI."
+    "get_location_by_name_and_type"
+    )
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.testing = True
+    return app.test_client()
+
+
+# Valor de una muestra en el texto de /metrics
+def sample_value(metrics_text, sample):
+    for line in metrics_text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.split(" ")[-1])
+    return 0.0
+
+
+# /metrics expone la latencia de las rutas con su status code
+def test_metrics_route_latency(client):
+    with patch(LOCATION_METHOD) as mock_get_location:
+        mock_get_location.return_value = {"name": "Earth", "type": "Planet"}
+        client.get("/location?name=earth")
+
+        mock_get_location.side_effect = ExternalAPIError(
+            "No matching location found",
+            status_code=404
+            )
+        client.get("/location?name=nowhere")
+
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",' \
+        'route="/location",status_code="200"}' in text
+    assert 'route="/location",status_code="404"' in text
+    assert "http_requests_in_flight" in text
+
+
+# Los resultados del cache de /location se cuentan en /metrics
+def test_metrics_location_cache(client):
+    samples = [
+        f'location_cache_requests_total{{result="{result}"}}'
+        for result in ("hits", "negative_hits", "misses")
+    ]
+    text = client.get("/metrics").get_data(True)
+    before = [sample_value(text, sample) for sample in samples]
+
+    with patch(LOCATION_METHOD) as mock_get_location:
+        mock_get_location.return_value = {"name": "Earth", "type": "Planet"}
+        client.get("/location?name=earth")
+        client.get("/location?name=earth")
+
+        mock_get_location.side_effect = ExternalAPIError(
+            "No matching location found",
+            status_code=404
+            )
+        client.get("/location?name=nowhere")
+        client.get("/location?name=nowhere")
+
+    text = client.get("/metrics").get_data(True)
+    after = [sample_value(text, sample) for sample in samples]
+    assert [a - b for a, b in zip(after, before)] == [1, 1, 2]
+    assert "location_cache_evictions_total" in text
+
+
+# Los errores de la API externa se cuentan por status code
+@patch("app.services.rick_and_morty_api.time.sleep")
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_metrics_upstream_errors(mock_get, mock_sleep, client):
+    sample = 'upstream_errors_total{status_code="504"}'
+    before = sample_value(client.get("/metrics").get_data(True), sample)
+
+    mock_get.side_effect = [Timeout("timeout"), MockResponse({})]
+    RickAndMortyAPI()._get("http://fakeurl.com/api/location")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert sample_value(text, sample) == before + 1
+    assert 'upstream_request_duration_seconds_count{endpoint="/location"}' \
+        in text
+
+
+# El endpoint de la API externa no depende de ids ni query params
+@pytest.mark.parametrize("url, endpoint", [
+    ("https://rickandmortyapi.com/api/character", "/character"),
+    ("https://rickandmortyapi.com/api/character?page=3", "/character"),
+    ("https://rickandmortyapi.com/api/character/1,2,3", "/character"),
+    ("https://rickandmortyapi.com/api/location?name=earth", "/location"),
+    ("https://rickandmortyapi.com/api", "/"),
+])
+def test_upstream_endpoint(url, endpoint):
+    assert upstream_endpoint("https://rickandmortyapi.com/api", url) == (
+        endpoint
+        )
+
+
+# Fuera de gunicorn (flask sync-mirror, run.py) el directorio de las
+# metricas multiproceso todavia no existe: se crea al importar el modulo
+def test_metrics_multiproc_dir_created(tmp_path):
+    directory = tmp_path / "prometheus_multiproc"
+
+    subprocess.run(
+        [sys.executable, "-c", "import app.metrics"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(directory)},
+        check=True
+        )
+
+    assert directory.is_dir()
@@ -0,0 +1,109 @@
+import json
+import pytest
+from app.services.page_parser import character_parser
+
+BASE_URL = "https://rickandmortyapi.com/api"
+
+CHARACTER = {
+    "id": 1,
+    "name": "Rick Sanchez",
+    "status": "Alive",
+    "species": "Human",
+    "type": "",
+    "gender": "Male",
+    "origin": {"name": "Earth (C-137)", "url": "https://x/location/1"},
+    "location": {"name": "Citadel of Ricks", "url": "https://x/location/3"},
+    "image": "https://x/character/avatar/1.jpeg",
+    "episode": ["https://x/episode/1", "https://x/episode/2"],
+    "url": "https://x/character/1",
+    "created": "2017-11-04T18:48:46.250Z",
+}
+
+PROJECTED = {
+    "id": 1,
+    "name": "Rick Sanchez",
+    "status": "Alive",
+    "species": "Human",
+    "gender": "Male",
+    "origin": {"name": "Earth (C-137)"},
+    "location": {"name": "Citadel of Ricks"},
+}
+
+
+# Divide el JSON en chunks de un byte para probar la decodificacion
+# incremental
+def chunks(data):
+    encoded = json.dumps(data).encode()
+    return [encoded[i:i + 1] for i in range(len(encoded))]
+
+
+def parse_character_page(chunks, path="/character"):
+    return character_parser(BASE_URL, BASE_URL + path)(chunks)
+
+
+# region - Tests for character_parser
+
+# Solo las paginas y las listas de personajes se decodifican proyectadas
+@pytest.mark.parametrize("path, streamed", [
+    ("/character", True),
+    ("/character?page=2", True),
+    ("/character/1,2,3", True),
+    ("/character/1", False),
+    ("/location?name=earth", False),
+    ("/episode", False),
+])
+def test_character_parser_urls(path, streamed):
+    assert (character_parser(BASE_URL, BASE_URL + path) is not None) == (
+        streamed
+        )
+
+
+def test_parse_page_keeps_projected_fields():
+    page = {
+        "info": {"count": 2, "pages": 1, "next": None, "prev": None},
+        "results": [CHARACTER, {**CHARACTER, "id": 2, "species": None}],
+    }
+
+    assert parse_character_page(chunks(page)) == {
+        "info": {"count": 2, "pages": 1, "next": None, "prev": None},
+        "results": [PROJECTED, {**PROJECTED, "id": 2, "species": None}],
+    }
+
+
+# Lista de personajes (/character/1,2)
+def test_parse_character_list():
+    assert parse_character_page(
+        chunks([CHARACTER, CHARACTER]),
+        "/character/1,2"
+        ) == [PROJECTED, PROJECTED]
+
+
+# info se encuentra aunque llegue despues de los personajes
+def test_parse_page_info_after_results():
+    body = b'{"results": [], "info": {"count": 0, "pages": 0}}'
+
+    assert parse_character_page([body]) == {
+        "info": {"count": 0, "pages": 0},
+        "results": [],
+    }
+
+
+# Los valores de otro tipo se conservan, igual que con json.loads
+def test_parse_unexpected_types():
+    page = {"results": [
+        {"name": True, "species": 72, "status": 1.5, "origin": "Earth"},
+        {},
+    ]}
+
+    assert parse_character_page(chunks(page)) == {"results": [
+        {"name": True, "species": 72, "status": 1.5},
+        {},
+    ]}
+
+
+@pytest.mark.parametrize("body", [b"", b"not-a-json", b'{"results": ['])
+def test_parse_invalid_json(body):
+    with pytest.raises(ValueError):
+        parse_character_page([body])
+
+# endregion
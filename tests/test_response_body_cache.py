@@ -0,0 +1,108 @@
+import gzip
+import weakref
+import pytest
+from app.services.response_body_cache import EncodedBody, ResponseBodyCache
+
+DATA = b'{"character_names":["Rick","Morty"]}\n' * 100
+
+
+# Version de prueba a la que se le puede tomar una referencia debil
+class Version:
+    pass
+
+
+# region - Tests for EncodedBody
+
+# Las versiones comprimidas se descomprimen al cuerpo original
+def test_encoded_body_round_trip():
+    body = EncodedBody(DATA)
+
+    assert body.encode("identity") is DATA
+    assert gzip.decompress(body.encode("gzip")) == DATA
+
+
+def test_encoded_body_brotli_round_trip():
+    brotli = pytest.importorskip("brotli")
+
+    assert brotli.decompress(EncodedBody(DATA).encode("br")) == DATA
+
+
+# Cada codificacion se comprime una sola vez
+def test_encoded_body_compresses_once():
+    body = EncodedBody(DATA)
+
+    assert body.encode("gzip") is body.encode("gzip")
+
+
+# Cada codificacion tiene su propio ETag
+def test_encoded_body_etags():
+    body = EncodedBody(DATA)
+
+    etags = {
+        body.etag_for(encoding) for encoding in ("identity", "gzip", "br")
+        }
+    assert len(etags) == 3
+    assert EncodedBody(DATA).etag == body.etag
+
+
+def test_encoded_body_unsupported_encoding():
+    with pytest.raises(ValueError):
+        EncodedBody(DATA).encode("deflate")
+
+# endregion
+
+
+# region - Tests for ResponseBodyCache
+
+# El cuerpo se reutiliza mientras la version sea el mismo objeto
+def test_cache_reuses_body_for_same_version():
+    cache = ResponseBodyCache()
+    version = {"character_names": []}
+    calls = []
+
+    def build():
+        calls.append(1)
+        return DATA
+
+    first = cache.get("route", "key", version, build)
+    second = cache.get("route", "key", version, build)
+    third = cache.get("route", "key", {"character_names": []}, build)
+
+    assert first is second
+    assert third is not first
+    assert len(calls) == 2
+
+
+# Con mas entradas que el maximo se descarta la usada hace mas tiempo
+def test_cache_evicts_least_recently_used():
+    cache = ResponseBodyCache(max_entries=2)
+    version = object()
+
+    a = cache.get("route", "a", version, lambda: b"a")
+    cache.get("route", "b", version, lambda: b"b")
+    cache.get("route", "a", version, lambda: b"a")
+    cache.get("route", "c", version, lambda: b"c")
+
+    assert cache.get("route", "a", version, lambda: b"new") is a
+    assert cache.get("route", "b", version, lambda: b"new").data == b"new"
+
+
+# Una version nueva descarta los cuerpos de la anterior, asi no se mantiene
+# vivo el objeto viejo. Los demas namespaces no cambian
+def test_cache_discards_old_versions():
+    cache = ResponseBodyCache()
+    old = Version()
+    other = Version()
+    cache.get("route", "a", old, lambda: b"a")
+    cache.get("route", "b", old, lambda: b"b")
+    kept = cache.get("other", "a", other, lambda: b"other")
+
+    cache.get("route", "a", Version(), lambda: b"new")
+    old_ref = weakref.ref(old)
+    del old
+
+    assert old_ref() is None
+    assert len(cache._entries) == 2
+    assert cache.get("other", "a", other, lambda: b"new") is kept
+
+# endregion
@@ -1,7 +1,11 @@
+import time
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from app.services.rick_and_morty_api import RickAndMortyAPI
-from app.exceptions.external_api import ExternalAPIError
+from app.exceptions.external_api import (
+    ExternalAPIError,
+    MissingCharactersError,
+)
 from conftest import MockResponse
 from requests.exceptions import Timeout, RequestException
 
@@ -257,6 +261,105 @@ def test_get_all_characters_stats_bad_pagination(mock_get):
     assert exc_info.value.status_code == 400
 
 
+# Fan-out en paralelo: las paginas se combinan en orden aunque terminen
+# en otro orden
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_get_all_characters_stats_parallel_pages(mock_get):
+    base = "https://rickandmortyapi.com/api/character"
+    pages = {
+        base: MockResponse({
+            "info": {"pages": 3, "next": f"{base}?page=2"},
+            "results": [
+                {"name": "Rick", "species": "Human", "status": "Alive"},
+            ]
+        }),
+        f"{base}?page=2": MockResponse({
+            "info": {"pages": 3, "next": f"{base}?page=3"},
+            "results": [
+                {"name": "Birdperson", "species": "Alien", "status": "Dead"},
+            ]
+        }),
+        f"{base}?page=3": MockResponse({
+            "info": {"pages": 3, "next": None},
+            "results": [
+                {"name": "Morty", "species": "Human", "status": "Alive"},
+            ]
+        }),
+    }
+
+    # La pagina 2 tarda mas que la 3
+    def fake_get(url, timeout):
+        if url.endswith("page=2"):
+            time.sleep(0.05)
+        return pages[url]
+
+    mock_get.side_effect = fake_get
+
+    api = RickAndMortyAPI()
+    api.base_url = "https://rickandmortyapi.com/api"
+    api.max_workers = 4
+    stats = api.get_all_characters_stats()
+
+    # Cada pagina se pide una sola vez y los nombres respetan el orden
+    assert mock_get.call_count == 3
+    assert stats["character_names"] == ["Rick", "Birdperson", "Morty"]
+    assert stats["human_count"] == 2
+    assert stats["not_human_count"] == 1
+    assert stats["alive_count"] == 2
+    assert stats["dead_count"] == 1
+
+
+# Con un solo worker se recorre la paginacion de forma secuencial
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_get_all_characters_stats_serial_fallback(mock_get):
+    mock_get.side_effect = [
+        MockResponse({
+            "info": {"pages": 2, "next": "next-url"},
+            "results": [
+                {"name": "Rick", "species": "Human", "status": "Alive"},
+            ]
+        }),
+        MockResponse({
+            "info": {"pages": 2, "next": None},
+            "results": [
+                {"name": "Morty", "species": "Human", "status": "Alive"},
+            ]
+        }),
+    ]
+
+    api = RickAndMortyAPI()
+    api.max_workers = 1
+    stats = api.get_all_characters_stats()
+
+    # El segundo request usa el URL de "next"
+    assert mock_get.call_args_list[1].args[0] == "next-url"
+    assert stats["character_names"] == ["Rick", "Morty"]
+
+
+# Un error en una pagina pedida en paralelo se propaga
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_get_all_characters_stats_parallel_error(mock_get):
+    def fake_get(url, timeout):
+        if url.endswith("page=2"):
+            return MockResponse({}, status_code=500, raise_http=True)
+        return MockResponse({
+            "info": {"pages": 3},
+            "results": [
+                {"name": "Rick", "species": "Human", "status": "Alive"},
+            ]
+        })
+
+    mock_get.side_effect = fake_get
+
+    api = RickAndMortyAPI()
+    api.max_workers = 4
+
+    with pytest.raises(ExternalAPIError) as exc_info:
+        api.get_all_characters_stats()
+
+    assert exc_info.value.status_code == 500
+
+
 # endregion
 
 
@@ -472,6 +575,22 @@ def test_get_invalid_json(mock_get):
     assert exc_info.value.status_code == 502
 
 
+# Con una sesion los requests se hacen a traves de ella
+def test_get_uses_session():
+    session = MagicMock()
+    session.get.return_value = MockResponse({"results": []})
+
+    api = RickAndMortyAPI(session=session)
+    result = api._get("http://fakeurl.com")
+
+    session.get.assert_called_once_with("http://fakeurl.com", timeout=10)
+    assert result == {"results": []}
+
+    # close cierra la sesion
+    api.close()
+    session.close.assert_called_once()
+
+
 # endregion
 
 
@@ -555,3 +674,131 @@ def test_extract_stats_invalid_name_type():
     assert result["alive_count"] == 1
 
 # endregion
+
+
+# region - Tests for stream parsing
+
+BASE_URL = "https://rickandmortyapi.com/api"
+
+
+@pytest.fixture
+def streaming_api(monkeypatch):
+    monkeypatch.setenv("RICK_AND_MORTY_STREAM_PARSING", "1")
+    return RickAndMortyAPI()
+
+
+# Las paginas de personajes se piden con stream=True y se guardan solo los
+# campos proyectados, con los mismos stats
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_stream_parsing_character_pages(mock_get, streaming_api):
+    characters = [
+        {"id": 1, "name": "Rick", "species": "Human", "status": "Alive",
+         "episode": ["e1", "e2"], "origin": {"name": "Earth", "url": "u"}},
+        {"id": 2, "name": "Birdperson", "species": None, "status": "Dead",
+         "image": "img"},
+    ]
+    mock_get.return_value = MockResponse({
+        "info": {"count": 2, "pages": 1, "next": None},
+        "results": characters
+    })
+
+    page = streaming_api.get_page("character")
+
+    mock_get.assert_called_once_with(
+        f"{BASE_URL}/character",
+        timeout=10,
+        stream=True
+        )
+    assert page["results"][0] == {
+        "id": 1,
+        "name": "Rick",
+        "species": "Human",
+        "status": "Alive",
+        "origin": {"name": "Earth"},
+        }
+    assert streaming_api.extract_character_stats(page["results"]) == (
+        RickAndMortyAPI.extract_character_stats(characters)
+        )
+
+
+# Las locaciones se siguen decodificando completas
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_stream_parsing_skips_locations(mock_get, streaming_api):
+    mock_get.return_value = MockResponse({
+        "results": [{"name": "Earth", "type": "Planet", "dimension": "C-137"}]
+    })
+
+    location = streaming_api.get_location_by_name_and_type("earth")
+
+    assert mock_get.call_args.kwargs == {"timeout": 10}
+    assert location["dimension"] == "C-137"
+
+
+# Un cuerpo invalido o incompleto devuelve 502
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_stream_parsing_invalid_json(mock_get, streaming_api):
+    mock_get.return_value = MockResponse('{"results": [', is_json=False)
+
+    with pytest.raises(ExternalAPIError) as exc_info:
+        streaming_api.get_page("character")
+
+    assert exc_info.value.status_code == 502
+
+
+# Sin ijson se decodifican las respuestas completas
+def test_stream_parsing_without_ijson(monkeypatch):
+    monkeypatch.setenv("RICK_AND_MORTY_STREAM_PARSING", "1")
+    monkeypatch.setattr("app.services.rick_and_morty_api.ijson", None)
+
+    assert RickAndMortyAPI().stream_parsing is False
+
+# endregion
+
+
+# region - Tests for iter_character_batches
+
+@pytest.fixture
+def batch_api():
+    external_api = RickAndMortyAPI()
+    external_api.max_workers = 1
+    external_api.batch_size = 2
+    return external_api
+
+
+# Los lotes se piden por ids y se devuelven ordenados por id, aunque la API
+# externa los devuelva en otro orden
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_character_batches_ordered_by_id(mock_get, batch_api):
+    mock_get.side_effect = [
+        MockResponse([{"id": 2, "name": "Morty"}, {"id": 1, "name": "Rick"}]),
+        # Con un unico id la API externa devuelve un objeto
+        MockResponse({"id": 3, "name": "Summer"}),
+    ]
+
+    batches = list(batch_api.iter_character_batches(3, [1, 2]))
+
+    assert batches == [
+        [{"id": 1, "name": "Rick"}, {"id": 2, "name": "Morty"}],
+        [{"id": 3, "name": "Summer"}],
+    ]
+    assert [call.args[0] for call in mock_get.call_args_list] == [
+        f"{batch_api.base_url}/character/1,2",
+        f"{batch_api.base_url}/character/3",
+    ]
+
+
+# Si faltan ids (o un unico id responde 404) se levanta
+# MissingCharactersError
+@pytest.mark.parametrize("response", [
+    MockResponse([{"id": 1, "name": "Rick"}]),
+    MockResponse([{"id": 1}, {"id": 4}]),
+    MockResponse({"error": "Not found"}, status_code=404, raise_http=True),
+])
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_character_batches_missing_ids(mock_get, response, batch_api):
+    mock_get.return_value = response
+
+    with pytest.raises(MissingCharactersError):
+        list(batch_api.iter_character_batches(2, [1]))
+
+# endregion
@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+import time
+import pytest
+from unittest.mock import MagicMock
+from app import create_app
+from app.extensions import CHARACTERS_CACHE, LOCATION_INDEX
+from app.services.cache import StaleWhileRevalidateCache
+from app.services.location_index import LocationIndex
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from app.services.shared_snapshot import SharedSnapshotCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "snapshots" / "characters.pickle")
+
+
+# Espera a que termine el refresh en segundo plano
+def wait_refresh(cache):
+    for _ in range(100):
+        if not cache._refreshing:
+            return
+        time.sleep(0.01)
+
+
+# Hace que el snapshot tenga la antiguedad indicada
+def age_snapshot(path, seconds):
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+# region - Tests for SharedSnapshotCache
+
+# La primera lectura calcula el valor y lo escribe en el archivo
+def test_snapshot_loads_once(path):
+    loader = MagicMock(return_value={"human_count": 1})
+    cache = SharedSnapshotCache(path, loader, ttl=60)
+
+    assert cache.get() == ({"human_count": 1}, 0.0)
+    value, age = cache.get()
+
+    assert value == {"human_count": 1}
+    assert age < 60
+    assert os.path.exists(path)
+    loader.assert_called_once_with()
+
+
+# Otro worker lee el snapshot sin calcularlo, y mientras el archivo no
+# cambia devuelve siempre el mismo objeto
+def test_snapshot_shared_between_caches(path):
+    SharedSnapshotCache(path, lambda: {"human_count": 1}, ttl=60).get()
+
+    loader = MagicMock()
+    other = SharedSnapshotCache(path, loader, ttl=60)
+    first, _ = other.get()
+    second, _ = other.get()
+
+    assert first == {"human_count": 1}
+    assert first is second
+    assert other.peek() is first
+    loader.assert_not_called()
+
+
+# Con el snapshot vencido se sirve el viejo y se recalcula en segundo plano
+def test_snapshot_serves_stale_and_refreshes(path):
+    loader = MagicMock(side_effect=["old", "new"])
+    cache = SharedSnapshotCache(path, loader, ttl=10)
+    cache.get()
+    age_snapshot(path, 15)
+
+    value, age = cache.get()
+    assert value == "old"
+    assert age >= 15
+
+    wait_refresh(cache)
+    value, age = cache.get()
+    assert value == "new"
+    assert age < 10
+
+
+# Si otro proceso tiene el lock el refresh no recalcula el valor
+def test_snapshot_refresh_single_writer(path):
+    loader = MagicMock(side_effect=["old", "new"])
+    cache = SharedSnapshotCache(path, loader, ttl=10)
+    cache.get()
+    age_snapshot(path, 15)
+
+    writer = SharedSnapshotCache(path, MagicMock(), ttl=10)
+    with writer._file_lock():
+        assert cache.get()[0] == "old"
+        wait_refresh(cache)
+
+    assert loader.call_count == 1
+
+
+# Si falla el refresh se sigue sirviendo el snapshot viejo
+def test_snapshot_refresh_failure_keeps_value(path):
+    loader = MagicMock(side_effect=["old", RuntimeError("upstream down")])
+    cache = SharedSnapshotCache(path, loader, ttl=10)
+    cache.get()
+    age_snapshot(path, 15)
+
+    cache.get()
+    wait_refresh(cache)
+
+    assert cache.get()[0] == "old"
+
+
+def test_snapshot_invalidate(path):
+    loader = MagicMock(side_effect=["old", "new"])
+    cache = SharedSnapshotCache(path, loader, ttl=60)
+    cache.get()
+
+    cache.invalidate()
+
+    assert cache.peek() is None
+    assert not os.path.exists(path)
+    assert cache.get()[0] == "new"
+
+
+# Carga de un worker: cuenta las llamadas al loader en un archivo
+def _worker_get(path, calls_path, results):
+    def loader():
+        with open(calls_path, "a") as calls_file:
+            calls_file.write("call\n")
+        time.sleep(0.2)
+        return {"human_count": 1}
+
+    value, _ = SharedSnapshotCache(path, loader, ttl=60).get()
+    results.put(value)
+
+
+# Varios procesos que piden el valor a la vez lo calculan una sola vez
+def test_snapshot_single_writer_across_processes(path, tmp_path):
+    calls_path = str(tmp_path / "calls")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=_worker_get, args=(path, calls_path, results))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    values = [results.get(timeout=10) for _ in processes]
+    for process in processes:
+        process.join(10)
+
+    assert values == [{"human_count": 1}] * 4
+    with open(calls_path) as calls_file:
+        assert calls_file.read().count("call") == 1
+
+# endregion
+
+
+# region - Tests for the app caches
+
+# Con SHARED_CACHE_DIR los caches de la app son snapshots compartidos
+def test_app_uses_shared_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHARED_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("LOCATION_INDEX", "1")
+    monkeypatch.setenv("LOCATION_INDEX_REFRESH_INTERVAL", "3600")
+    monkeypatch.setattr(LocationIndex, "start", lambda self: None)
+
+    app = create_app()
+
+    cache = app.extensions[CHARACTERS_CACHE]
+    assert isinstance(cache, SharedSnapshotCache)
+    assert cache.path == str(tmp_path / "characters.pickle")
+    location_index = app.extensions[LOCATION_INDEX]
+    assert location_index.snapshot.path == str(tmp_path / "locations.pickle")
+
+
+def test_app_uses_memory_caches_by_default():
+    app = create_app()
+
+    cache = app.extensions[CHARACTERS_CACHE]
+    assert isinstance(cache, StaleWhileRevalidateCache)
+
+
+# Los indices de locaciones de varios workers descargan las locaciones
+# una sola vez
+def test_location_index_shared_snapshot(tmp_path):
+    external_api = MagicMock()
+    external_api.iter_all_pages.side_effect = lambda resource: iter([
+        {"results": [{"id": 1, "name": "Earth (C-137)", "type": "Planet"}]},
+    ])
+    external_api.first_location = RickAndMortyAPI.first_location
+    shared_path = str(tmp_path / "locations.pickle")
+
+    first = LocationIndex(external_api, 60, shared_path=shared_path)
+    second = LocationIndex(external_api, 60, shared_path=shared_path)
+    first.load()
+    second.load()
+
+    location = second.get_location_by_name_and_type(name="earth")
+    assert location["name"] == "Earth (C-137)"
+    external_api.iter_all_pages.assert_called_once_with("location")
+
+# endregion
@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app.services.single_flight import SingleFlight
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from app.exceptions.external_api import ExternalAPIError
+from conftest import MockResponse
+
+
+# Ejecuta "do" desde varios threads mientras la funcion esta bloqueada y
+# devuelve lo que recibio cada thread
+def run_concurrently(single_flight, key, fn, threads=5):
+    results = []
+
+    def worker():
+        try:
+            results.append(single_flight.do(key, fn))
+        except Exception as e:
+            results.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    return workers, results
+
+
+# Las llamadas simultaneas con la misma clave ejecutan la funcion una vez
+def test_single_flight_shares_result():
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    single_flight = SingleFlight()
+    workers, results = run_concurrently(single_flight, "key", fn)
+
+    # Espero a que todos los threads esten esperando al lider
+    while "key" not in single_flight._calls:
+        pass
+    time.sleep(0.1)
+    release.set()
+    for thread in workers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+
+
+# El error del lider se entrega a todos los que esperaban
+def test_single_flight_shares_error():
+    release = threading.Event()
+    error = ExternalAPIError("Request timed out", status_code=504)
+
+    def fn():
+        release.wait()
+        raise error
+
+    single_flight = SingleFlight()
+    workers, results = run_concurrently(single_flight, "key", fn)
+
+    while "key" not in single_flight._calls:
+        pass
+    time.sleep(0.1)
+    release.set()
+    for thread in workers:
+        thread.join()
+
+    assert all(result is error for result in results)
+
+
+# Cuando la llamada termina la siguiente se vuelve a ejecutar
+def test_single_flight_runs_again_after_completion():
+    single_flight = SingleFlight()
+
+    assert single_flight.do("key", lambda: 1) == 1
+    assert single_flight.do("key", lambda: 2) == 2
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", lambda: int("x"))
+    assert single_flight._calls == {}
+
+
+# Requests simultaneos al mismo URL hacen un solo request a la API externa
+@patch("app.services.rick_and_morty_api.requests.get")
+def test_api_get_coalesces_requests(mock_get):
+    release = threading.Event()
+
+    def fake_get(url, timeout):
+        release.wait()
+        return MockResponse({"results": [{"name": "Earth", "type": "Planet"}]})
+
+    mock_get.side_effect = fake_get
+    api = RickAndMortyAPI()
+
+    results = []
+    workers = [
+        threading.Thread(
+            target=lambda: results.append(api._get("http://fakeurl.com"))
+            )
+        for _ in range(5)
+        ]
+    for thread in workers:
+        thread.start()
+
+    while mock_get.call_count == 0:
+        pass
+    time.sleep(0.1)
+    release.set()
+    for thread in workers:
+        thread.join()
+
+    assert mock_get.call_count == 1
+    assert len(results) == 5
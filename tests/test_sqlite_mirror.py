@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app import create_app
+from app.services.rick_and_morty_api import RickAndMortyAPI
+from app.services.sqlite_mirror import SQLiteMirror
+from app.exceptions.external_api import ExternalAPIError
+
+CHARACTERS = [
+    {"id": 1, "name": "Rick", "species": "Human", "status": "Alive",
+     "origin": {"name": "Earth (C-137)"}},
+    {"id": 2, "name": "Birdperson", "species": None, "status": "Dead"},
+    {"id": 3, "name": True, "species": "Robot", "status": True},
+    {"id": 4, "name": "Jerry", "species": True, "status": "Unknown"},
+    {"id": 5, "name": "Summer", "species": "Human", "status": 0},
+]
+
+LOCATIONS = [
+    {"id": 1, "name": "Earth (C-137)", "type": "Planet"},
+    {"id": 2, "name": "Abadango", "type": "Cluster"},
+    {"id": 3, "name": "Earth (Replacement Dimension)", "type": "Planet"},
+    {"id": 4, "name": "100%_Planet", "type": "Planet"},
+]
+
+
+# API externa falsa que devuelve los datos en dos paginas
+class FakeExternalAPI:
+    def __init__(self):
+        self.sync_count = 0
+        self.characters = CHARACTERS
+
+    def iter_all_pages(self, resource):
+        if resource == "character":
+            self.sync_count += 1
+            data = self.characters
+        else:
+            data = LOCATIONS
+        yield {"results": data[:2]}
+        yield {"results": data[2:]}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return SQLiteMirror(
+        str(tmp_path / "mirror.sqlite3"),
+        FakeExternalAPI(),
+        max_age=60
+        )
+
+
+# region - Tests for get_all_characters_stats
+
+# Los stats calculados con SQL son iguales a los de extract_character_stats
+def test_mirror_characters_stats_match_extract(mirror):
+    stats = mirror.get_all_characters_stats()
+
+    assert stats == RickAndMortyAPI.extract_character_stats(CHARACTERS)
+
+
+# Los nombres vacios no se devuelven, igual que en extract_character_stats
+def test_mirror_characters_stats_skip_empty_names(mirror):
+    characters = CHARACTERS + [
+        {"id": 6, "name": "", "species": "Human", "status": "Alive"},
+    ]
+    mirror.external_api.characters = characters
+
+    stats = mirror.get_all_characters_stats()
+
+    assert stats == RickAndMortyAPI.extract_character_stats(characters)
+    assert "" not in stats["character_names"]
+
+
+# El store de la copia da los mismos contadores que extract_character_stats
+def test_mirror_character_store_matches_extract(mirror):
+    store = mirror.get_character_store()
+
+    assert store.character_stats() == (
+        RickAndMortyAPI.extract_character_stats(CHARACTERS)
+        )
+    assert store.count_by(["origin"])[0] == {"origin": None, "count": 4}
+
+
+# La primera consulta sincroniza la copia; las siguientes no
+def test_mirror_syncs_once_while_fresh(mirror):
+    mirror.get_all_characters_stats()
+    mirror.get_all_characters_stats()
+
+    assert mirror.external_api.sync_count == 1
+    assert mirror.synced_at() is not None
+
+
+# Varios requests que llegan a la vez con la copia vacia sincronizan una
+# sola vez: los demas esperan a la primera sincronizacion
+def test_mirror_concurrent_cold_lookups_sync_once(mirror):
+    iter_all_pages = mirror.external_api.iter_all_pages
+
+    def slow_iter_all_pages(resource):
+        time.sleep(0.05)
+        return iter_all_pages(resource)
+
+    mirror.external_api.iter_all_pages = slow_iter_all_pages
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(mirror.get_all_characters_stats())
+            )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(results) == 4
+    assert mirror.external_api.sync_count == 1
+
+
+# Una copia vencida se sigue usando y se sincroniza en segundo plano
+def test_mirror_stale_syncs_in_background(mirror):
+    mirror.sync()
+    mirror.max_age = 0
+
+    stats = mirror.get_all_characters_stats()
+    for _ in range(100):
+        if mirror.external_api.sync_count == 2 and not mirror._syncing:
+            break
+        time.sleep(0.01)
+
+    assert stats["character_names"] == [
+        "Rick", "Birdperson", "Jerry", "Summer"
+        ]
+    assert mirror.external_api.sync_count == 2
+
+# endregion
+
+
+# region - Tests for get_location_by_name_and_type
+
+# Los filtros son parciales, sin distinguir mayusculas y respetan el orden
+def test_mirror_location_partial_match(mirror):
+    result = mirror.get_location_by_name_and_type(name="EARTH", type_="plan")
+
+    assert result["name"] == "Earth (C-137)"
+    assert result["type"] == "Planet"
+
+
+# Sin filtros devuelve la primera locacion
+def test_mirror_location_without_filters(mirror):
+    result = mirror.get_location_by_name_and_type()
+
+    assert result["name"] == "Earth (C-137)"
+
+
+# Los comodines de LIKE se buscan literalmente
+def test_mirror_location_escapes_wildcards(mirror):
+    assert mirror.get_location_by_name_and_type(name="%_")["name"] == (
+        "100%_Planet"
+        )
+
+    with pytest.raises(ExternalAPIError):
+        mirror.get_location_by_name_and_type(name="a_a")
+
+
+# Busqueda sin resultados devuelve el mismo 404 que la API externa
+def test_mirror_location_not_found(mirror):
+    with pytest.raises(ExternalAPIError) as exc_info:
+        mirror.get_location_by_name_and_type(name="earth", type_="cluster")
+
+    assert "No matching location found" in str(exc_info.value)
+    assert exc_info.value.status_code == 404
+
+# endregion
+
+
+# region - Tests for iter_character_rows
+
+# Las filas se leen en listas de chunk_size, en el orden de la API
+def test_mirror_character_rows(mirror):
+    chunks = list(mirror.iter_character_rows(chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0][0] == (
+        1, "Rick", "Human", "Alive", None, "Earth (C-137)", None
+        )
+    assert chunks[1][0] == (3, None, "Robot", None, None, None, None)
+
+# endregion
+
+
+# region - Tests for the sqlite backend
+
+# Con STORAGE_BACKEND=sqlite las rutas responden desde la copia local
+def test_sqlite_backend_routes(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_MIRROR_PATH", str(tmp_path / "app.sqlite3"))
+
+    with patch(
+            "app.extensions.RickAndMortyAPI",
+            side_effect=lambda session: FakeExternalAPI()
+            ):
+        app = create_app()
+
+    client = app.test_client()
+    characters = client.get("/characters").get_json()
+    location = client.get("/location?name=abadango").get_json()
+
+    assert characters["human_count"] == 2
+    assert location == {"name": "Abadango", "type": "Cluster"}
+
+    # El export se lee de la copia local
+    export = client.get("/characters/export?format=ndjson")
+    lines = [json.loads(line) for line in export.data.splitlines()]
+    assert [line["id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert lines[0]["origin"] == "Earth (C-137)"
+
+
+# El comando sync-mirror sincroniza la copia local
+def test_sync_mirror_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_MIRROR_PATH", str(tmp_path / "cli.sqlite3"))
+
+    with patch(
+            "app.extensions.RickAndMortyAPI",
+            side_effect=lambda session: FakeExternalAPI()
+            ):
+        app = create_app()
+
+    result = app.test_cli_runner().invoke(args=["sync-mirror"])
+
+    assert "SQLite mirror synced" in result.output
+    assert app.extensions["sqlite_mirror"].synced_at() is not None
+
+# endregion
@@ -0,0 +1,126 @@
+import importlib.util
+import os
+from unittest.mock import MagicMock
+from app.services.warm_up import WarmUp
+
+
+# region - Tests for WarmUp
+
+# run corre los pasos en orden y marca el warm-up como terminado
+def test_warm_up_runs_steps():
+    calls = []
+    warm_up = WarmUp([
+        lambda: calls.append("characters"),
+        lambda: calls.append("locations"),
+    ])
+
+    assert not warm_up.ready
+    assert warm_up.run()
+    assert warm_up.ready
+    assert calls == ["characters", "locations"]
+
+
+# Si un paso falla se guarda el error y se reintenta
+def test_warm_up_retries_failed_steps():
+    step = MagicMock(side_effect=[RuntimeError("upstream down"), None])
+    warm_up = WarmUp([step], retry_interval=0)
+
+    assert warm_up.run()
+    assert warm_up.ready
+    assert warm_up.error is None
+    assert step.call_count == 2
+
+
+# Mientras falla, el error queda disponible y el warm-up no termina
+def test_warm_up_reports_error():
+    warm_up = WarmUp(
+        [MagicMock(side_effect=RuntimeError("upstream down"))],
+        retry_interval=60
+        )
+
+    warm_up.start()
+    for _ in range(100):
+        if warm_up.error is not None:
+            break
+        warm_up.wait(0.01)
+    warm_up.stop()
+
+    assert not warm_up.ready
+    assert warm_up.error == "upstream down"
+
+
+# start corre el warm-up en segundo plano
+def test_warm_up_start_in_background():
+    step = MagicMock()
+    warm_up = WarmUp([step])
+
+    warm_up.start()
+
+    assert warm_up.wait(1)
+    step.assert_called_once_with()
+
+
+# skip marca la app como lista sin correr los pasos
+def test_warm_up_skip():
+    step = MagicMock()
+    warm_up = WarmUp([step])
+
+    warm_up.skip()
+    warm_up.start()
+
+    assert warm_up.ready
+    step.assert_not_called()
+
+
+# Con un directorio de marcas la app esta lista recien cuando terminaron
+# todos los workers
+def test_warm_up_waits_for_all_workers(tmp_path):
+    warm_up = WarmUp([MagicMock()], ready_dir=str(tmp_path), workers=2)
+
+    assert warm_up.run()
+    assert (tmp_path / str(os.getpid())).exists()
+    assert not warm_up.ready
+
+    (tmp_path / "12345").touch()
+    assert warm_up.ready
+
+# endregion
+
+
+# region - Tests for the gunicorn hooks
+
+def load_gunicorn_conf():
+    path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "gunicorn.conf.py"
+        )
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Con WARMUP=1 el master crea el directorio de marcas y el worker que
+# termina pierde la suya
+def test_gunicorn_warm_up_markers(monkeypatch):
+    monkeypatch.setenv("WARMUP", "1")
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    # on_starting las reemplaza, y monkeypatch las restaura al terminar
+    monkeypatch.setenv("WARMUP_READY_DIR", "")
+    monkeypatch.setenv("WARMUP_WORKERS", "1")
+    conf = load_gunicorn_conf()
+    server = MagicMock()
+    server.cfg.workers = 3
+
+    conf.on_starting(server)
+    directory = os.environ["WARMUP_READY_DIR"]
+    assert os.environ["WARMUP_WORKERS"] == "3"
+
+    open(os.path.join(directory, "42"), "w").close()
+    conf.child_exit(server, MagicMock(pid=42))
+    assert os.listdir(directory) == []
+
+    conf.on_exit(server)
+    assert not os.path.exists(directory)
+
+# endregion